@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import itertools
+from CommandParser import CommandParser
+from TransactionManager import TransactionManager
+
+
+class TransactionAborted(Exception):
+    pass
+
+
+class Session:
+    """One client's view of the front end: a sequence of transactions."""
+
+    def __init__(self, front_end):
+        self.front_end = front_end
+        self.transaction_id = None
+
+    async def begin(self, read_only=False):
+        """Start a new transaction with a fresh id and return the id."""
+        self.transaction_id = self.front_end.allocate_transaction_id()
+        await self.front_end.submit("begin", self.transaction_id, read_only)
+        return self.transaction_id
+
+    async def read(self, variable):
+        """Read a variable; waits, without blocking other sessions, while its site is down."""
+        return await self.front_end.submit("R", self.transaction_id, variable)
+
+    async def write(self, variable, value):
+        await self.front_end.submit("W", self.transaction_id, variable, value)
+
+    async def end(self):
+        """End the current transaction and return "committed" or "aborted"."""
+        return await self.front_end.submit("end", self.transaction_id)
+
+
+class AsyncTransactionManager:
+    def __init__(self, transaction_manager=None, **kwargs):
+        """
+        Serve a TransactionManager to many concurrent asyncio clients.
+        Requests from all clients go through one ordered queue, and each request
+        is given the next logical timestamp when it is executed. kwargs are
+        passed to TransactionManager if none is given.
+        """
+        self.transaction_manager = transaction_manager or TransactionManager(**kwargs)
+        self.requests = asyncio.Queue()
+        self.timestamp = 1  # Logical timestamp of the next request
+        self.transaction_ids = itertools.count(1)
+        self.worker = None
+        self.handlers = {
+            "begin": self._begin,
+            "beginRO": lambda timestamp, transaction_id: self._begin(timestamp, transaction_id, True),
+            "R": self._read,
+            "W": self._write,
+            "end": self._end,
+            "fail": self._fail,
+            "recover": self._recover,
+            "dump": self._dump,
+        }
+
+    async def start(self):
+        if self.worker is None:
+            self.worker = asyncio.create_task(self._process())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def session(self):
+        return Session(self)
+
+    def allocate_transaction_id(self):
+        """Return a transaction id not used by any transaction started so far."""
+        transaction_id = next(self.transaction_ids)
+        while transaction_id in self.transaction_manager.transactions:
+            transaction_id = next(self.transaction_ids)
+        return transaction_id
+
+    async def submit(self, command, *args):
+        """
+        Queue a request and wait for its result.
+        A read whose site is down resolves only when the site recovers.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.requests.put((command, args, future))
+        result = await future
+        if isinstance(result, asyncio.Future):
+            result = await result
+        return result
+
+    async def fail(self, site_id):
+        await self.submit("fail", site_id)
+
+    async def recover(self, site_id):
+        await self.submit("recover", site_id)
+
+    async def dump(self, *target):
+        await self.submit("dump", *target)
+
+    async def _process(self):
+        """Execute queued requests one at a time, in arrival order."""
+        while True:
+            command, args, future = await self.requests.get()
+            timestamp = self.timestamp
+            self.timestamp += 1
+            try:
+                handler = self.handlers.get(command)
+                if handler is None:
+                    raise Exception(f"Unknown command: {command}")
+                result = handler(timestamp, *args)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    def _begin(self, timestamp, transaction_id, read_only=False):
+        self.transaction_manager.start_transaction(transaction_id, timestamp, read_only)
+        return transaction_id
+
+    def _read(self, timestamp, transaction_id, variable):
+        transaction_manager = self.transaction_manager
+        value = transaction_manager.read_intention(transaction_id, variable)
+        pending = transaction_manager.wait_queue.pending(transaction_id)
+        if pending and pending[-1].waiter is None:
+            # The read is blocked: hand back a future resolved by the site's recovery
+            return self._wait_for(pending[-1])
+        if transaction_manager.transactions[transaction_id].status == "aborted":
+            raise TransactionAborted(f"Transaction T{transaction_id} aborted.")
+        return value
+
+    def _wait_for(self, entry):
+        future = asyncio.get_running_loop().create_future()
+
+        def resolve(value):
+            if future.done():
+                return
+            if entry.cancelled:
+                future.set_exception(TransactionAborted(
+                    f"Transaction T{entry.transaction_id} ended while waiting to read {entry.variable}."))
+            else:
+                future.set_result(value)
+
+        entry.waiter = resolve
+        return future
+
+    def _write(self, timestamp, transaction_id, variable, value):
+        self.transaction_manager.write_intention(transaction_id, variable, value, timestamp)
+
+    def _end(self, timestamp, transaction_id):
+        return self.transaction_manager.commit(transaction_id, timestamp)
+
+    def _fail(self, timestamp, site_id):
+        self.transaction_manager.update_site_status(site_id, "down", timestamp)
+
+    def _recover(self, timestamp, site_id):
+        self.transaction_manager.update_site_status(site_id, "up", timestamp)
+
+    def _dump(self, timestamp, *target):
+        if not self.transaction_manager.querystate(*target):
+            raise Exception(f"Cannot dump {target[0]}.")
+
+    async def handle_client(self, reader, writer):
+        """
+        Serve one socket client speaking the trace language, one command per line.
+        Every line other than a blank or `//` comment line is answered with "ok",
+        a read value, "committed"/"aborted", or "error: <message>", including
+        lines that cannot be parsed.
+        """
+        parser = CommandParser()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode().strip()
+                if not line or line.startswith("//"):
+                    continue
+                try:
+                    command, args = parser.parse_command(line)
+                    result = await self.submit(command, *args)
+                    reply = "ok" if result is None or command in ("begin", "beginRO") else str(result)
+                except TransactionAborted:
+                    reply = "aborted"
+                except Exception as e:
+                    reply = f"error: {e}"
+                writer.write((reply + "\n").encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """Accept socket clients until cancelled."""
+        await self.start()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the TransactionManager to socket clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(AsyncTransactionManager().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,167 @@
+import argparse
+import gc
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+from CommandParser import CommandParser
+from EventSink import NullSink
+from Main import Main
+from ReplicaSelector import ReplicaSelector
+from TransactionManager import TransactionManager
+from WorkloadGenerator import add_workload_arguments, generator_from_arguments
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class CountingSink(NullSink):
+    """
+    Discard events but count them, and remember why each running transaction
+    first aborted; a transaction can emit several aborts before its end().
+    """
+
+    def __init__(self):
+        self.events = Counter()
+        self.abort_reasons = {}  # transaction_id -> reason of its first abort, until it ends
+
+    def emit(self, event, **fields):
+        self.events[event] += 1
+        if event == "abort":
+            self.abort_reasons.setdefault(fields["transaction"], fields["reason"])
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Benchmark:
+    def __init__(self, lines, num_sites=10, num_variables=20, track_memory=False, replica_policy="ordered"):
+        """
+        Replay the given trace lines through a fresh TransactionManager.
+        With track_memory, peak memory is measured with tracemalloc, which
+        slows the run down; otherwise the process' peak resident size is reported.
+        """
+        self.lines = lines
+        self.num_sites = num_sites
+        self.num_variables = num_variables
+        self.track_memory = track_memory
+        self.replica_policy = replica_policy
+
+    def run(self):
+        """Run the benchmark and return its results as a dict."""
+        sink = CountingSink()
+        latencies = {}  # command -> array of per-operation latencies in seconds
+        outcomes = Counter()  # final status returned by end() -> transactions
+        aborts = Counter()  # reason of the first abort -> aborted transactions
+        handlers = Main.handlers
+        clock = time.perf_counter
+
+        if self.track_memory:
+            tracemalloc.start()
+        gc.collect()
+        # Loading the initial data is timed apart from the replay, which it would swamp on large layouts
+        setup_started = clock()
+        transaction_manager = TransactionManager(self.num_sites, self.num_variables, sink=sink,
+                                                 replica_policy=self.replica_policy)
+        setup = clock() - setup_started
+        started = clock()
+        timestamp = 1
+        for command, args, _ in CommandParser().parse(self.lines):
+            handler = handlers.get(command)
+            if handler is None:
+                timestamp += 1
+                continue
+            before = clock()
+            result = handler(transaction_manager, args, timestamp)
+            elapsed = clock() - before
+            if command == "end":
+                # One outcome per transaction, whatever it emitted along the way
+                outcomes[result] += 1
+                reason = sink.abort_reasons.pop(args[0], None)
+                if result == "aborted":
+                    aborts[reason] += 1
+            samples = latencies.get(command)
+            if samples is None:
+                samples = latencies[command] = array("d")
+            samples.append(elapsed)
+            timestamp += 1
+        total = clock() - started
+
+        if self.track_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        elif resource is not None:
+            peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Kilobytes on Linux
+        else:
+            peak_memory = None
+
+        operations = {}
+        for command, samples in latencies.items():
+            ordered = sorted(samples)
+            operations[command] = {
+                "count": len(ordered),
+                "p50": percentile(ordered, 0.50),
+                "p99": percentile(ordered, 0.99),
+            }
+        count = sum(stats["count"] for stats in operations.values())
+        return {
+            "operations": count,
+            "setup_seconds": setup,
+            "seconds": total,
+            "ops_per_second": count / total if total else 0.0,
+            "commits": outcomes["committed"],
+            "aborts": outcomes["aborted"],
+            "aborts_by_reason": dict(aborts),
+            "peak_memory": peak_memory,
+            "peak_memory_source": "tracemalloc" if self.track_memory else "maxrss",
+            "per_operation": operations,
+            "replica_policy": self.replica_policy,
+            "reads_by_site": dict(transaction_manager.replicas.served),
+        }
+
+    @staticmethod
+    def report(result):
+        """Format benchmark results as a human-readable table."""
+        ended = result["commits"] + result["aborts"]
+        lines = [
+            f"operations                {result['operations']}",
+            f"setup                     {result['setup_seconds']:.3f} s",
+            f"elapsed                   {result['seconds']:.3f} s",
+            f"throughput                {result['ops_per_second']:.0f} ops/s",
+            f"commits                   {result['commits']} ({100.0 * result['commits'] / ended if ended else 0.0:.1f}%)",
+            f"aborts                    {result['aborts']} ({100.0 * result['aborts'] / ended if ended else 0.0:.1f}%)",
+        ]
+        for reason, count in sorted(result["aborts_by_reason"].items()):
+            lines.append(f"  {reason:<24}{count}")
+        if result["peak_memory"] is not None:
+            lines.append(f"peak memory               {result['peak_memory'] / (1 << 20):.1f} MiB ({result['peak_memory_source']})")
+        reads = result["reads_by_site"]
+        lines.append(f"reads by site ({result['replica_policy']})"
+                     + "".join(f" {site_id}:{count}" for site_id, count in sorted(reads.items())))
+        lines.append(f"{'command':<10}{'count':>10}{'p50 (us)':>12}{'p99 (us)':>12}")
+        for command, stats in sorted(result["per_operation"].items()):
+            lines.append(f"{command:<10}{stats['count']:>10}{stats['p50'] * 1e6:>12.1f}{stats['p99'] * 1e6:>12.1f}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the TransactionManager on a synthetic or recorded trace.")
+    add_workload_arguments(parser)
+    parser.add_argument("--trace", metavar="FILE", help="replay FILE instead of a generated workload")
+    parser.add_argument("--memory", action="store_true", help="measure peak memory with tracemalloc")
+    parser.add_argument("--replica-policy", choices=ReplicaSelector.POLICIES, default="ordered",
+                        help="how reads of replicated variables pick a site (default: ordered)")
+    args = parser.parse_args()
+
+    if args.trace:
+        with open(args.trace, "r") as file:
+            result = Benchmark(file, args.sites, args.variables, args.memory, args.replica_policy).run()
+    else:
+        workload = generator_from_arguments(args)
+        result = Benchmark(workload.lines(), args.sites, args.variables, args.memory, args.replica_policy).run()
+    print(Benchmark.report(result))
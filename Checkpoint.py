@@ -0,0 +1,97 @@
+import mmap
+import os
+from array import array
+
+MAGIC = b"RCCKPT01"
+
+
+class Checkpoint:
+    def __init__(self, num_sites, num_variables, clock, wal_offset, sites, last_commit_time):
+        """
+        A compact snapshot of TransactionManager state.
+        - clock: the last logical timestamp covered by the snapshot.
+        - wal_offset: where the write-ahead log tail to replay on top of it starts.
+        - sites: site_id -> (status, committed_after_recovery, histories, events), with
+          histories mapping variable -> (commit_times, values) and events a list of
+          (timestamp, status).
+        - last_commit_time: variable -> commit time of its newest committed version.
+        """
+        self.num_sites = num_sites
+        self.num_variables = num_variables
+        self.clock = clock
+        self.wal_offset = wal_offset
+        self.sites = sites
+        self.last_commit_time = last_commit_time
+
+    def save(self, path, placement):
+        """
+        Write the checkpoint atomically, as one flat array of 64-bit integers after
+        the magic bytes. Variables are stored by their integer id.
+        """
+        data = array("q", [self.num_sites, self.num_variables, self.clock, self.wal_offset])
+        for site_id, (status, committed_after_recovery, histories, events) in sorted(self.sites.items()):
+            data.extend((site_id, 1 if status == "up" else 0, len(committed_after_recovery)))
+            data.extend(placement.index(variable) for variable in committed_after_recovery)
+            data.append(len(histories))
+            for variable, (commit_times, values) in histories.items():
+                data.extend((placement.index(variable), len(commit_times)))
+                data.extend(commit_times)
+                data.extend(values)
+            data.append(len(events))
+            for timestamp, event_status in events:
+                data.extend((timestamp, 1 if event_status == "up" else 0))
+        data.extend(self.last_commit_time.get(placement.name(i), 0) for i in range(1, self.num_variables + 1))
+
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(MAGIC)
+            data.tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path, placement):
+        """Memory-map a checkpoint written by save and decode it."""
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise Exception(f"{path} is not a checkpoint.")
+            view = memoryview(data)[len(MAGIC):].cast("q")
+            try:
+                return cls._decode(view, placement)
+            finally:
+                view.release()
+
+    @classmethod
+    def _decode(cls, view, placement):
+        num_sites, num_variables, clock, wal_offset = view[0:4]
+        if (num_sites, num_variables) != (placement.num_sites, placement.num_variables):
+            raise Exception(f"Checkpoint layout of {num_sites} sites and {num_variables} variables "
+                            f"does not match the current placement.")
+        name = placement.name
+        position = 4
+        sites = {}
+        for _ in range(num_sites):
+            site_id, status, count = view[position:position + 3]
+            position += 3
+            committed_after_recovery = [name(index) for index in view[position:position + count]]
+            position += count
+            histories = {}
+            variable_count = view[position]
+            position += 1
+            for _ in range(variable_count):
+                index, length = view[position:position + 2]
+                position += 2
+                commit_times = array("q", view[position:position + length].tobytes())
+                position += length
+                values = view[position:position + length].tolist()
+                position += length
+                histories[name(index)] = (commit_times, values)
+            event_count = view[position]
+            position += 1
+            events = view[position:position + 2 * event_count].tolist()
+            position += 2 * event_count
+            events = [(events[i], "up" if events[i + 1] else "down") for i in range(0, len(events), 2)]
+            sites[site_id] = ("up" if status else "down", committed_after_recovery, histories, events)
+        last_commit_time = {name(i + 1): t for i, t in enumerate(view[position:position + num_variables])}
+        return cls(num_sites, num_variables, clock, wal_offset, sites, last_commit_time)
@@ -0,0 +1,113 @@
+import re
+import sys
+from collections import namedtuple
+
+# A parsed command: its name, converted arguments and the line number it came from
+Operation = namedtuple("Operation", ["command", "args", "line"])
+
+
+def parse_transaction(arg):
+    return int(arg[1:])  # Strip 'T' and convert to int
+
+
+def parse_variable(arg):
+    return f"x{int(arg[1:])}"  # Strip 'x' and normalize the name
+
+
+def parse_dump_target(arg):
+    """Return "delta", a variable name or a site id."""
+    if arg == "delta":
+        return arg
+    if arg.startswith("x"):
+        return parse_variable(arg)
+    return int(arg)
+
+
+class CommandParser:
+    # Matches formats like `command(arg1, arg2, ...)`, ignoring anything after the closing parenthesis
+    COMMAND_PATTERN = re.compile(r"(\w+)\s*\(\s*([^)]*)\s*\)")
+    ARGUMENT_SEPARATOR = re.compile(r"\s*,\s*")
+
+    # Default argument converters: command -> function(list of raw args) -> tuple of args
+    CONVERTERS = {
+        "begin": lambda args: (parse_transaction(args[0]),),
+        "beginRO": lambda args: (parse_transaction(args[0]),),
+        "R": lambda args: (parse_transaction(args[0]), parse_variable(args[1])),
+        "W": lambda args: (parse_transaction(args[0]), parse_variable(args[1]), int(args[2])),
+        "fail": lambda args: (int(args[0]),),
+        "recover": lambda args: (int(args[0]),),
+        "end": lambda args: (parse_transaction(args[0]),),
+        "dump": lambda args: (parse_dump_target(args[0]),) if args else (),
+    }
+
+    def __init__(self):
+        self.converters = dict(self.CONVERTERS)
+
+    def register(self, command, converter):
+        """Register (or replace) the argument converter of a command."""
+        self.converters[command] = converter
+
+    def parse_command(self, line):
+        """
+        Parse one stripped line holding a single command into (command, args).
+        Raises an Exception if the line is not a command or its arguments cannot be converted.
+        """
+        match = self.COMMAND_PATTERN.match(line)
+        if not match:
+            raise Exception(f"Invalid command format: {line}")
+        command, args = match.groups()
+        args = self.ARGUMENT_SEPARATOR.split(args.strip()) if args else []
+        converter = self.converters.get(command)
+        if converter is None:
+            return command, tuple(args)
+        try:
+            return command, converter(args)
+        except (IndexError, ValueError):
+            raise Exception(f"Invalid arguments for {command}: {line}")
+
+    def parse(self, lines):
+        """
+        Lazily parse an iterable of lines into Operations.
+        Blank lines, `//` comment lines and `===` expected-output sections
+        (which run until the next blank or comment line, or a line that is a
+        known command) are skipped.
+        Lines that are not commands are reported on stderr.
+        Commands without a registered converter are passed through with
+        their raw string arguments.
+        """
+        match_command = self.COMMAND_PATTERN.match
+        split_args = self.ARGUMENT_SEPARATOR.split
+        converters = self.converters
+        in_expected_output = False
+
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                in_expected_output = False
+                continue
+            if line.startswith("//"):
+                in_expected_output = False
+                continue
+            if line.startswith("==="):
+                in_expected_output = True
+                continue
+
+            match = match_command(line)
+            if in_expected_output:
+                if not match or match.group(1) not in converters:
+                    continue
+                # A known command right after expected output ends the section
+                in_expected_output = False
+            if not match:
+                print(f"Invalid command format: {line}", file=sys.stderr)
+                continue
+
+            command, args = match.groups()
+            args = split_args(args.strip()) if args else []
+            converter = converters.get(command)
+            yield Operation(command, converter(args) if converter else tuple(args), line_number)
+
+    def parse_file(self, input_file):
+        """Lazily parse a file, reading one line at a time."""
+        with open(input_file, "r") as file:
+            yield from self.parse(file)
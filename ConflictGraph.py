@@ -0,0 +1,173 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+# Edge labels, combined as bits when two transactions conflict in several ways
+RW = 1  # Anti-dependency: the source read the version the target's write replaced
+WR = 2  # The target read the version the source wrote
+WW = 4  # The target's write replaced the source's version
+
+# A committed transaction kept in the graph; reads and writes are (variable id, version time) pairs
+CommittedNode = namedtuple("CommittedNode", ["transaction_id", "start_time", "commit_time", "reads", "writes"])
+
+
+class ConflictGraph:
+    MIN_PRUNE_SIZE = 64
+
+    def __init__(self):
+        """
+        Serialization graph of committed transactions for serializable snapshot isolation.
+        Nodes are numbered in commit order, since transaction ids may be reused.
+        Versions are identified by their version time (the W timestamp), which is
+        what decides what a snapshot sees. Each committing transaction is only
+        linked to the writers of the versions it read or replaced, the writer of
+        the version that replaced one it read, and the readers of the version it
+        replaced; older conflicts are implied by the chain of ww edges.
+        """
+        self.nodes = {}  # node -> CommittedNode
+        self.out_edges = {}  # node -> {target node: label bits}
+        self.writer_times = {}  # variable id -> ascending version times written by nodes
+        self.writer_nodes = {}  # variable id -> nodes, parallel to writer_times
+        self.readers = {}  # variable id -> {version time: nodes that read that version}
+        self.next_node = 0
+        self.prune_at = self.MIN_PRUNE_SIZE  # Graph size that triggers the next prune
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _writer(self, variable_id, version_time):
+        """Return the node that wrote the given version, or None if it is not in the graph."""
+        times = self.writer_times.get(variable_id)
+        if not times:
+            return None
+        index = bisect_right(times, version_time) - 1
+        if index >= 0 and times[index] == version_time:
+            return self.writer_nodes[variable_id][index]
+        return None
+
+    def _next_writer(self, variable_id, version_time):
+        """Return the node that wrote the oldest version after the given one, or None."""
+        times = self.writer_times.get(variable_id)
+        if not times:
+            return None
+        index = bisect_right(times, version_time)
+        return self.writer_nodes[variable_id][index] if index < len(times) else None
+
+    def edges_for(self, reads, writes):
+        """
+        Return (incoming, outgoing): the edges a committing transaction gets, as
+        {node: label bits} from and to already committed nodes.
+        - reads: variable id -> version time it read.
+        - writes: variable id -> (version time of its write, version time it replaces).
+        """
+        incoming = {}
+        outgoing = {}
+        for variable_id, version_time in reads.items():
+            node = self._writer(variable_id, version_time)
+            if node is not None:
+                incoming[node] = incoming.get(node, 0) | WR
+            node = self._next_writer(variable_id, version_time)
+            if node is not None:
+                outgoing[node] = outgoing.get(node, 0) | RW  # Its version was not in our snapshot
+        for variable_id, (_, replaced_time) in writes.items():
+            node = self._writer(variable_id, replaced_time)
+            if node is not None:
+                incoming[node] = incoming.get(node, 0) | WW
+            for node in self.readers.get(variable_id, {}).get(replaced_time, ()):
+                incoming[node] = incoming.get(node, 0) | RW  # It read the version we are replacing
+        return incoming, outgoing
+
+    def find_cycle(self, incoming, outgoing):
+        """
+        Look for a cycle through the committing transaction: a path from one of
+        its outgoing edges back to one of its incoming edges. Under snapshot
+        isolation every such cycle contains two consecutive rw edges.
+        Only nodes reachable from the outgoing edges are visited, each once.
+        Returns the nodes of the cycle in order, or None.
+        """
+        out_edges = self.out_edges
+        parents = dict.fromkeys(outgoing)
+        stack = list(outgoing)
+        while stack:
+            node = stack.pop()
+            if node in incoming:
+                cycle = []
+                while node is not None:
+                    cycle.append(node)
+                    node = parents[node]
+                cycle.reverse()
+                return cycle
+            for target in out_edges[node]:
+                if target not in parents:
+                    parents[target] = node
+                    stack.append(target)
+        return None
+
+    def add(self, transaction_id, start_time, commit_time, reads, writes, incoming, outgoing):
+        """Add a committed transaction with the edges computed by edges_for."""
+        node = self.next_node
+        self.next_node += 1
+        read_versions = tuple(reads.items())
+        write_versions = tuple((variable_id, version_time) for variable_id, (version_time, _) in writes.items())
+        self.nodes[node] = CommittedNode(transaction_id, start_time, commit_time, read_versions, write_versions)
+        self.out_edges[node] = outgoing
+        for source, labels in incoming.items():
+            edges = self.out_edges[source]
+            edges[node] = edges.get(node, 0) | labels
+        for variable_id, version_time in read_versions:
+            self.readers.setdefault(variable_id, {}).setdefault(version_time, set()).add(node)
+        for variable_id, version_time in write_versions:
+            times = self.writer_times.setdefault(variable_id, [])
+            nodes = self.writer_nodes.setdefault(variable_id, [])
+            if not times or times[-1] < version_time:
+                times.append(version_time)
+                nodes.append(node)
+            else:
+                index = bisect_right(times, version_time)
+                times.insert(index, version_time)
+                nodes.insert(index, node)
+        return node
+
+    def prune(self, horizon):
+        """
+        Drop the nodes that can no longer be part of a cycle.
+        A node committed before the horizon (the oldest active start time) only
+        gains outgoing edges from now on, so it is only on a future cycle if it
+        is reachable from a node committed at or after the horizon.
+        Returns the number of nodes dropped.
+        """
+        nodes = self.nodes
+        reachable = {node for node, record in nodes.items() if record.commit_time >= horizon}
+        stack = list(reachable)
+        while stack:
+            for target in self.out_edges[stack.pop()]:
+                if target not in reachable:
+                    reachable.add(target)
+                    stack.append(target)
+
+        dropped = [node for node in nodes if node not in reachable]
+        for node in dropped:
+            record = nodes.pop(node)
+            del self.out_edges[node]
+            for variable_id, version_time in record.reads:
+                versions = self.readers[variable_id]
+                readers = versions[version_time]
+                readers.discard(node)
+                if not readers:
+                    del versions[version_time]
+                    if not versions:
+                        del self.readers[variable_id]
+            for variable_id, version_time in record.writes:
+                times = self.writer_times[variable_id]
+                index = bisect_right(times, version_time) - 1
+                del times[index]
+                del self.writer_nodes[variable_id][index]
+                if not times:
+                    del self.writer_times[variable_id]
+                    del self.writer_nodes[variable_id]
+        return len(dropped)
+
+    def maybe_prune(self, horizon):
+        """Prune once the graph has doubled since the last prune, so pruning costs O(1) per commit amortized."""
+        if len(self.nodes) >= self.prune_at:
+            self.prune(horizon)
+            self.prune_at = max(self.MIN_PRUNE_SIZE, 2 * len(self.nodes))
@@ -1,9 +1,13 @@
+from VersionStore import VersionChain
+
+
 class DataManager:
-    def __init__(self, site_id):
+    def __init__(self, site_id, placement):
         self.site_id = site_id
+        self.placement = placement  # PlacementCatalog shared with the TransactionManager
         self.variables = {}  # Tracks current committed values: variable -> value
         self.status = "up"  # Current status of the site: "up" or "down"
-        self.version_history = {}  # Tracks version history: variable -> list of [value, commit_time]
+        self.version_history = {}  # Tracks version history: variable -> VersionChain
         self.committed_after_recovery = set()  # Tracks variables committed to after recovery
 
     def read(self, variable, start_time):
@@ -21,12 +25,31 @@ class DataManager:
         #    raise Exception(f"Variable {variable} has not been committed to after recovery at Site {self.site_id}.")
 
         # Find the most recent version committed before start_time
-        for value, commit_time in reversed(self.version_history[variable]):
-            if commit_time <= start_time:
-                return value
+        version = self.version_history[variable].at_or_before(start_time)
+        if version is not None:
+            return version[0]
 
         raise Exception(f"No valid version of {variable} found at Site {self.site_id} for start_time {start_time}.")
 
+    def version_at_or_before(self, variable, time):
+        """
+        Return (value, commit_time) of the newest version of a variable committed
+        at or before the given time, or None if the site holds no such version.
+        Unlike read, this does not depend on the site being up.
+        """
+        history = self.version_history.get(variable)
+        if history is None:
+            return None
+        return history.at_or_before(time)
+
+    def latest_commit_time(self, variable):
+        """Return the commit time of the newest version of a variable, or None."""
+        history = self.version_history.get(variable)
+        if history is None:
+            return None
+        latest = history.latest()
+        return latest[1] if latest is not None else None
+
     def write(self, variable, value, commit_time):
         """
         Write a new value to a variable.
@@ -37,10 +60,10 @@ class DataManager:
             raise Exception(f"Site {self.site_id} is down, cannot write to {variable}.")
 
         if variable not in self.version_history:
-            self.version_history[variable] = []
+            self.version_history[variable] = VersionChain()
 
         # Append the new version to the history
-        self.version_history[variable].append([value, commit_time])
+        self.version_history[variable].append(value, commit_time)
         self.variables[variable] = value  # Update the current value
         self.committed_after_recovery.add(variable)  # Mark as committed after recovery
         #print(f"Wrote {variable} = {value} at Site {self.site_id} with commit_time {commit_time}.")
@@ -55,12 +78,51 @@ class DataManager:
         self.committed_after_recovery.clear()  # Clear tracking for replicated variables
 
         # Retain only the last committed entry in the version history
-        for variable, history in self.version_history.items():
-            if history:
-                # Keep only the last committed entry
-                self.version_history[variable] = [history[-1]]  # Clear the committed-after-recovery tracker
+        for history in self.version_history.values():
+            history.keep_latest()
         #print(f"Site {self.site_id} has failed.")
 
+    def collect_garbage(self, horizon, variables=None):
+        """
+        Drop versions older than the newest version at or before the horizon
+        (the start time of the oldest active transaction).
+        Only the given variables are collected if provided, otherwise all of them.
+        Returns the number of versions dropped.
+        """
+        if variables is None:
+            variables = self.version_history
+        dropped = 0
+        for variable in variables:
+            history = self.version_history.get(variable)
+            if history is not None:
+                dropped += history.collect(horizon)
+        return dropped
+
+    def version_counts(self):
+        """Return the number of versions kept for each variable: variable -> chain length."""
+        return {variable: len(history) for variable, history in self.version_history.items()}
+
+    def export_state(self):
+        """
+        Return the site's durable state as
+        (status, committed_after_recovery, {variable: (commit_times, values)}).
+        """
+        histories = {variable: (history.commit_times, history.values)
+                     for variable, history in self.version_history.items()}
+        return self.status, sorted(self.committed_after_recovery), histories
+
+    def import_state(self, status, committed_after_recovery, histories):
+        """Replace the site's state with one produced by export_state."""
+        self.status = status
+        self.committed_after_recovery = set(committed_after_recovery)
+        self.version_history = {}
+        self.variables = {}
+        for variable, (commit_times, values) in histories.items():
+            history = VersionChain.from_arrays(commit_times, values)
+            self.version_history[variable] = history
+            if len(history):
+                self.variables[variable] = history.latest()[0]
+
     def recover(self):
         """
         Simulate a site recovery.
@@ -73,9 +135,7 @@ class DataManager:
 
         # Update the availability of variables
         for variable in self.variables:
-            variable_index = int(variable[1:])  # Extract the numeric part of the variable name
-
-            if variable_index % 2 != 0:
+            if not self.placement.is_replicated(variable):
                 # Non-replicated (odd-numbered) variables: require tracking for reads after recovery
                 if variable not in self.committed_after_recovery:
                     self.committed_after_recovery.add(variable)  # Add to post-recovery tracking
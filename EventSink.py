@@ -0,0 +1,101 @@
+import json
+import sys
+
+
+def _format_abort(fields):
+    reason = fields["reason"]
+    transaction = fields["transaction"]
+    if reason == "no_valid_site":
+        return f"Transaction T{transaction} aborted: No valid site could provide the value for {fields['variable']}."
+    if reason == "first_committer_wins":
+        return (f"Transaction T{transaction} aborted: {fields['variable']} was committed at {fields['commit_time']}, "
+                f"after transaction start time {fields['start_time']}.")
+    if reason == "failure":
+        return (f"Transaction T{transaction} aborted: Write timestamp {fields['write_time']} for {fields['variable']} "
+                f"precedes failure timestamp {fields['failure_time']} on Site {fields['site']}.")
+    if reason == "read_only_write":
+        return f"Transaction T{transaction} aborted: It is read-only and cannot write {fields['variable']}."
+    if reason == "cycle":
+        cycle = " -> ".join(f"T{t}" for t in fields["cycle"] + fields["cycle"][:1])
+        return f"Transaction T{transaction} aborted: Committing would close the dependency cycle {cycle}."
+    return f"Transaction T{transaction} aborted: {reason}."
+
+
+# Text rendering of each event: event -> function(fields) -> str
+EVENT_FORMATS = {
+    "begin": lambda f: (f"Starting {'read-only ' if f['read_only'] else ''}transaction T{f['transaction']} "
+                        f"at timestamp {f['timestamp']}."),
+    "read": lambda f: f"Transaction T{f['transaction']} read {f['variable']}:{f['value']} from Site {f['site']}.",
+    "abort": _format_abort,
+    "write": lambda f: f"Transaction T{f['transaction']} wrote {f['variable']} to sites: {', '.join(map(str, f['sites']))}",
+    "commit": lambda f: f"Transaction T{f['transaction']} has been committed.",
+    "recover": lambda f: f"Site {f['site']} has been recovered.",
+    "wake_read": lambda f: (f"Transaction T{f['transaction']} read {f['variable']}:{f['value']} "
+                            f"from recovered Site {f['site']}."),
+    "wake_failed": lambda f: (f"Transaction T{f['transaction']} failed to read {f['variable']} "
+                              f"from recovered Site {f['site']}: {f['error']}"),
+    "dump": lambda f: "\n--- Dump State ---\n" + "".join(line + "\n" for line in f["lines"]) + "--------------------",
+    "dump_failed": lambda f: f"Cannot dump {f['target']}: {f['error']}",
+}
+
+
+class EventSink:
+    """Receives the events a TransactionManager produces."""
+
+    def emit(self, event, **fields):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class ConsoleSink(EventSink):
+    """Print every event to stdout as soon as it happens."""
+
+    def emit(self, event, **fields):
+        print(EVENT_FORMATS[event](fields))
+
+
+class NullSink(EventSink):
+    """Discard every event, for pure benchmarking."""
+
+    def emit(self, event, **fields):
+        pass
+
+
+class BufferedSink(EventSink):
+    """Write event text to a file, in chunks of buffer_size events."""
+
+    def __init__(self, file, buffer_size=4096):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def render(self, event, fields):
+        return EVENT_FORMATS[event](fields)
+
+    def emit(self, event, **fields):
+        self.buffer.append(self.render(event, fields))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file not in (sys.stdout, sys.stderr):
+            self.file.close()
+
+
+class JsonLinesSink(BufferedSink):
+    """Write one JSON object per event, for offline analysis."""
+
+    def render(self, event, fields):
+        return json.dumps({"event": event, **fields})
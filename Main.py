@@ -1,64 +1,185 @@
-import re
+import argparse
 import sys
+from CommandParser import CommandParser
+from EventSink import BufferedSink, JsonLinesSink, NullSink
+from ReplicaSelector import ReplicaSelector
 from TransactionManager import TransactionManager
 
+
+def _begin(transaction_manager, args, timestamp):
+    transaction_manager.start_transaction(args[0], timestamp)
+
+
+def _begin_read_only(transaction_manager, args, timestamp):
+    transaction_manager.start_transaction(args[0], timestamp, is_read_only=True)
+
+
+def _read(transaction_manager, args, timestamp):
+    transaction_manager.read_intention(args[0], args[1])
+
+
+def _write(transaction_manager, args, timestamp):
+    transaction_manager.write_intention(args[0], args[1], args[2], timestamp)
+
+
+def _fail(transaction_manager, args, timestamp):
+    transaction_manager.update_site_status(args[0], "down", timestamp)
+
+
+def _recover(transaction_manager, args, timestamp):
+    transaction_manager.update_site_status(args[0], "up", timestamp)
+
+
+def _end(transaction_manager, args, timestamp):
+    return transaction_manager.commit(args[0], timestamp)
+
+
+def _dump(transaction_manager, args, timestamp):
+    transaction_manager.querystate(*args)
+
+
 class Main:
-    @staticmethod
-    def main(input_file: str) -> None:
-        transaction_manager = TransactionManager()
-        try:
-            with open(input_file, "r") as file:
-                timestamp = 1  # Logical timestamp to simulate the order of operations
-                for line in file:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # Parse command using regex to handle formats like `command(arg1, arg2, ...)`
-                    match = re.match(r"(\w+)\s*\(\s*([^)]*)\s*\)", line)
-                    if not match:
-                        print(f"Invalid command format: {line}", file=sys.stderr)
-                        continue
-
-                    command, args = match.groups()
-                    # Split arguments by comma and strip spaces from each argument
-                    args = [arg.strip() for arg in args.split(",")] if args else []
-
-                    # Handle commands
-                    if command == "begin":
-                        transaction_id = int(args[0][1:])  # Strip 'T' and convert to int
-                        transaction_manager.start_transaction(transaction_id, timestamp)
-                    elif command == "R":
-                        #print(str(timestamp)+'R')
-                        transaction_id = int(args[0][1:])  # Strip 'T' and convert to int
-                        variable_id = int(args[1][1:])  # Strip 'x' and convert to int
-                        transaction_manager.read_intention(transaction_id, f"x{variable_id}")
-                    elif command == "W":
-                        transaction_id = int(args[0][1:])  # Strip 'T' and convert to int
-                        variable_id = int(args[1][1:])  # Strip 'x' and convert to int
-                        value = int(args[2])  # Convert value to int
-                        transaction_manager.write_intention(transaction_id, f"x{variable_id}", value,timestamp)
-                    elif command == "fail":
-                        site_id = int(args[0])  # Convert to int
-                        transaction_manager.update_site_status(site_id, "down",timestamp)
-                    elif command == "recover":
-                        site_id = int(args[0])  # Convert to int
-                        transaction_manager.update_site_status(site_id, "up",timestamp)
-                    elif command == "end":
-                        transaction_id = int(args[0][1:])  # Strip 'T' and convert to int
-                        transaction_manager.commit(transaction_id,timestamp)
-                    elif command == "dump":
-                        transaction_manager.querystate()
-                    else:
-                        print(f"Unknown command: {command}", file=sys.stderr)
-
-                    # Increment the logical timestamp after processing each line
-                    timestamp += 1
+    parser = CommandParser()
+
+    # Dispatch table: command -> handler(transaction_manager, args, timestamp)
+    handlers = {
+        "begin": _begin,
+        "beginRO": _begin_read_only,
+        "R": _read,
+        "W": _write,
+        "fail": _fail,
+        "recover": _recover,
+        "end": _end,
+        "dump": _dump,
+    }
+
+    @classmethod
+    def register(cls, command, handler, converter=None):
+        """
+        Register a new command.
+        The handler is called with (transaction_manager, args, timestamp);
+        the optional converter turns the raw string arguments into args.
+        """
+        cls.handlers[command] = handler
+        if converter is not None:
+            cls.parser.register(command, converter)
+
+    @classmethod
+    def run(cls, transaction_manager, operations, timestamp=1):
+        """
+        Execute parsed operations in order, one logical timestamp per operation.
+        Returns the next unused timestamp.
+        """
+        handlers = cls.handlers
+        for command, args, _ in operations:
+            handler = handlers.get(command)
+            if handler is None:
+                print(f"Unknown command: {command}", file=sys.stderr)
+            else:
+                handler(transaction_manager, args, timestamp)
+
+            # Increment the logical timestamp after processing each operation
+            timestamp += 1
+        return timestamp
 
+    @classmethod
+    def main(cls, input_file: str, sink=None, shards=0, wal=None, checkpoint=None, checkpoint_every=0,
+             restore=False, sync=False, replica_policy="ordered", stats=False, profile=None,
+             reload_on_recover=False) -> None:
+        transaction_manager = TransactionManager(sink=sink, shards=shards, replica_policy=replica_policy)
+        profiler = None
+        try:
+            timestamp = 1
+            if restore:
+                # Continue from the saved state: the trace picks up after its last timestamp
+                timestamp = transaction_manager.restore(checkpoint, wal) + 1
+            if wal:
+                transaction_manager.enable_persistence(wal, checkpoint, checkpoint_every, sync, reload_on_recover)
+            if stats:
+                transaction_manager.enable_metrics()
+            if profile:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                cls.run(transaction_manager, cls.parser.parse_file(input_file), timestamp)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
         except Exception as e:
             print(f"Error: {e}", file=sys.stderr)
+        finally:
+            transaction_manager.sink.flush()
+            if stats:
+                from Metrics import format_stats
+                print(format_stats(transaction_manager.stats()), file=sys.stderr)
+            if profiler is not None:
+                report_profile(profiler, profile)
+            transaction_manager.close()
+            transaction_manager.sink.close()
+
+
+def report_profile(profiler, destination):
+    """Save the profile to destination, or print the hottest functions to stderr if it is "-"."""
+    if destination != "-":
+        profiler.dump_stats(destination)
+        return
+    import pstats
+    pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a transaction trace through the TransactionManager.")
+    parser.add_argument("input_file", nargs="?", default="test1.txt", help="trace file to replay")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--quiet", action="store_true", help="discard all events (benchmarking)")
+    output.add_argument("--output", metavar="FILE", help="write event text to FILE through a buffered writer")
+    output.add_argument("--jsonl", metavar="FILE", help="write events to FILE as JSON lines")
+    parser.add_argument("--shards", type=int, default=0, metavar="N",
+                        help="run the sites in N worker processes instead of in-process")
+    parser.add_argument("--replica-policy", choices=ReplicaSelector.POLICIES, default="ordered",
+                        help="how reads of replicated variables pick a site (default: ordered)")
+    diagnostics = parser.add_argument_group("diagnostics")
+    diagnostics.add_argument("--stats", action="store_true",
+                             help="time the hot paths and print a stats snapshot to stderr at the end")
+    diagnostics.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                             help="run under cProfile; save the profile to FILE or print a summary to stderr")
+    persistence = parser.add_argument_group("persistence")
+    persistence.add_argument("--wal", metavar="FILE", help="append committed writes and site events to FILE")
+    persistence.add_argument("--checkpoint", metavar="FILE", help="checkpoint file written with --checkpoint-every")
+    persistence.add_argument("--checkpoint-every", type=int, default=0, metavar="N",
+                             help="write a checkpoint every N commits")
+    persistence.add_argument("--sync", action="store_true", help="fsync the log on every commit")
+    persistence.add_argument("--restore", action="store_true",
+                             help="start from --checkpoint plus the --wal tail instead of the initial data")
+    persistence.add_argument("--reload-on-recover", action="store_true",
+                             help="rebuild a recovering site from --checkpoint and the --wal instead of its memory")
+    args = parser.parse_args(argv)
+    if args.checkpoint_every and not (args.wal and args.checkpoint):
+        parser.error("--checkpoint-every requires --wal and --checkpoint")
+    if args.checkpoint and not (args.wal or args.restore):
+        parser.error("--checkpoint requires --wal, or --restore to start from an existing checkpoint")
+    if args.sync and not args.wal:
+        parser.error("--sync requires --wal")
+    if args.restore and not (args.wal or args.checkpoint):
+        parser.error("--restore requires --wal or --checkpoint")
+    if args.reload_on_recover and not args.wal:
+        parser.error("--reload-on-recover requires --wal")
+    return args
+
+
+def make_sink(args):
+    """Build the event sink selected on the command line; None means print to the console."""
+    if args.quiet:
+        return NullSink()
+    if args.output:
+        return BufferedSink(open(args.output, "w", encoding="utf-8"))
+    if args.jsonl:
+        return JsonLinesSink(open(args.jsonl, "w", encoding="utf-8"))
+    return None
 
 
 if __name__ == "__main__":
-    input_file = "test1.txt"  # Replace with the actual path to your test case file
-    Main.main(input_file)
+    args = parse_arguments()
+    Main.main(args.input_file, make_sink(args), args.shards, args.wal, args.checkpoint, args.checkpoint_every,
+              args.restore, args.sync, args.replica_policy, args.stats, args.profile, args.reload_on_recover)
@@ -0,0 +1,137 @@
+import time
+from array import array
+from collections import Counter
+from EventSink import EventSink
+
+
+class LatencyHistogram:
+    BUCKETS = 48  # Bucket i counts latencies in [2**(i-1), 2**i) nanoseconds; 2**47 ns is about 39 hours
+
+    def __init__(self):
+        self.counts = array("q", bytes(8 * self.BUCKETS))
+        self.count = 0
+        self.total = 0  # Nanoseconds
+        self.max = 0
+
+    def record(self, nanoseconds):
+        self.counts[min(nanoseconds.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+
+    def percentile(self, fraction):
+        """Return the upper bound, in nanoseconds, of the bucket holding the given fraction of samples."""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(1 << bucket, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(0.50) / 1e3,
+            "p99_us": self.percentile(0.99) / 1e3,
+            "max_us": self.max / 1e3,
+        }
+
+
+class MetricsSink(EventSink):
+    """Forward every event to another sink, counting events and aborts by reason on the way."""
+
+    def __init__(self, sink, metrics):
+        self.sink = sink
+        self.metrics = metrics
+
+    def emit(self, event, **fields):
+        self.metrics.events[event] += 1
+        if event == "abort":
+            self.metrics.aborts[fields["reason"]] += 1
+        self.sink.emit(event, **fields)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
+
+
+class Metrics:
+    # TransactionManager methods whose calls are timed
+    TIMED_METHODS = ("read_intention", "write_intention", "commit", "update_site_status")
+
+    def __init__(self):
+        """
+        Opt-in counters and latency histograms for a TransactionManager.
+        Nothing is measured until attach is called, and attaching only replaces
+        attributes of that one instance, so managers without metrics run the
+        plain class methods.
+        """
+        self.latencies = {name: LatencyHistogram() for name in self.TIMED_METHODS}
+        self.events = Counter()  # event -> number emitted
+        self.aborts = Counter()  # abort reason -> count
+        self.max_wait_queue = 0  # Deepest the wait queue has been after a timed call
+
+    def attach(self, transaction_manager):
+        """Wrap the timed methods and the event sink of a TransactionManager."""
+        transaction_manager.sink = MetricsSink(transaction_manager.sink, self)
+        for name in self.TIMED_METHODS:
+            setattr(transaction_manager, name,
+                    self._timed(getattr(transaction_manager, name), self.latencies[name],
+                                transaction_manager.wait_queue))
+
+    def _timed(self, method, histogram, wait_queue):
+        clock = time.perf_counter_ns
+        record = histogram.record
+
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(clock() - started)
+                depth = len(wait_queue)
+                if depth > self.max_wait_queue:
+                    self.max_wait_queue = depth
+
+        timed.__name__ = method.__name__
+        timed.__doc__ = method.__doc__
+        return timed
+
+    def snapshot(self):
+        return {
+            "latency": {name: histogram.snapshot() for name, histogram in self.latencies.items()},
+            "events": dict(self.events),
+            "aborts": dict(self.aborts),
+            "max_wait_queue": self.max_wait_queue,
+        }
+
+
+def format_stats(stats):
+    """Format a TransactionManager.stats() snapshot as a human-readable table."""
+    lines = [
+        f"active transactions       {stats['active_transactions']}",
+        f"waiting reads             {stats['wait_queue']}",
+        f"conflict graph nodes      {stats['conflict_graph']}",
+        f"{'site':<6}{'status':>8}{'waiting':>9}{'versions':>10}{'longest':>9}",
+    ]
+    for site_id, site in sorted(stats["sites"].items()):
+        lines.append(f"{site_id:<6}{site['status']:>8}{site['waiting_reads']:>9}{site['versions']:>10}"
+                     f"{site['longest_chain']:>9}")
+    metrics = stats.get("metrics")
+    if metrics is not None:
+        lines.append(f"max waiting reads         {metrics['max_wait_queue']}")
+        lines.append(f"aborts                    {sum(metrics['aborts'].values())}")
+        for reason, count in sorted(metrics["aborts"].items()):
+            lines.append(f"  {reason:<24}{count}")
+        lines.append(f"{'method':<20}{'calls':>10}{'mean (us)':>11}{'p50 (us)':>10}{'p99 (us)':>10}{'max (us)':>10}")
+        for name, latency in metrics["latency"].items():
+            lines.append(f"{name:<20}{latency['count']:>10}{latency['mean_us']:>11.1f}{latency['p50_us']:>10.1f}"
+                         f"{latency['p99_us']:>10.1f}{latency['max_us']:>10.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+# Where a variable lives: its integer id, whether it is replicated, and its home sites
+VariablePlacement = namedtuple("VariablePlacement", ["index", "replicated", "sites"])
+
+
+class PlacementCatalog:
+    def __init__(self, num_sites=10, num_variables=20):
+        """
+        Build the placement of variables x1..x{num_variables} over sites 1..{num_sites}.
+        Even-indexed variables are replicated on every site; odd-indexed variables
+        live only on site 1 + (index % num_sites).
+        """
+        self.num_sites = num_sites
+        self.num_variables = num_variables
+        self.site_ids = tuple(range(1, num_sites + 1))
+        self.placements = {}  # variable -> VariablePlacement
+        self.names = [None] * (num_variables + 1)  # index -> variable name
+        self.site_variables = {site_id: [] for site_id in self.site_ids}  # site_id -> variables, by index
+
+        for i in range(1, num_variables + 1):
+            variable = f"x{i}"
+            if i % 2 == 0:  # Even-indexed variables
+                sites = self.site_ids
+            else:  # Odd-indexed variables
+                sites = (1 + (i % num_sites),)
+            self.placements[variable] = VariablePlacement(i, i % 2 == 0, sites)
+            self.names[i] = variable
+            for site_id in sites:
+                self.site_variables[site_id].append(variable)
+
+    def __contains__(self, variable):
+        return variable in self.placements
+
+    def __getitem__(self, variable):
+        """Return the VariablePlacement of a variable."""
+        try:
+            return self.placements[variable]
+        except KeyError:
+            raise Exception(f"Variable {variable} does not exist.") from None
+
+    def __iter__(self):
+        """Iterate over variable names in index order."""
+        return iter(self.placements)
+
+    def index(self, variable):
+        return self[variable].index
+
+    def name(self, index):
+        return self.names[index]
+
+    def is_replicated(self, variable):
+        return self[variable].replicated
+
+    def sites_for(self, variable):
+        return self[variable].sites
+
+    def variables_at(self, site_id):
+        """Return the variables stored at a site, ordered by index."""
+        return self.site_variables[site_id]
@@ -0,0 +1,57 @@
+class ReplicaSelector:
+    POLICIES = ("ordered", "round_robin", "least_loaded", "cost")
+
+    def __init__(self, site_ids, policy="ordered", costs=None):
+        """
+        Decide which replica of a variable a read is sent to.
+        - ordered: home sites in site id order (the original behaviour).
+        - round_robin: rotate the first up replica tried on every read.
+        - least_loaded: fewest reads served so far first.
+        - cost: lowest costs[site_id] * (1 + reads served) first, so reads spread in
+          inverse proportion to cost; unlisted sites cost 1.
+        Reads are served synchronously, so the load of a site is the number of reads
+        it has served rather than a count of reads in flight.
+        Site status is kept as a bitmap of up sites, one bit per site.
+        """
+        if policy not in self.POLICIES:
+            raise Exception(f"Unknown replica policy {policy}.")
+        self.policy = policy
+        self.bits = {site_id: 1 << position for position, site_id in enumerate(site_ids)}  # site_id -> bit
+        self.up_mask = sum(self.bits.values())  # Bit set for every site that is up
+        self.served = dict.fromkeys(site_ids, 0)  # site_id -> reads served so far
+        self.costs = dict.fromkeys(site_ids, 1.0)  # site_id -> relative cost of a read
+        if costs:
+            self.costs.update(costs)
+        self.cursor = 0  # Round-robin position
+
+    def mark(self, site_id, status):
+        """Record that a site went up or down."""
+        if status == "up":
+            self.up_mask |= self.bits[site_id]
+        else:
+            self.up_mask &= ~self.bits[site_id]
+
+    def candidates(self, sites):
+        """Return the up sites among a variable's home sites, in the order they should be tried."""
+        up_mask, bits = self.up_mask, self.bits
+        up = [site_id for site_id in sites if up_mask & bits[site_id]]
+        if len(up) < 2 or self.policy == "ordered":
+            return up
+        if self.policy == "round_robin":
+            start = self.cursor % len(up)
+            self.cursor += 1
+            return up[start:] + up[:start]
+        served = self.served
+        if self.policy == "least_loaded":
+            return sorted(up, key=served.__getitem__)
+        costs = self.costs
+        return sorted(up, key=lambda site_id: costs[site_id] * (1 + served[site_id]))
+
+    def down(self, sites):
+        """Return the down sites among a variable's home sites, in site id order."""
+        up_mask, bits = self.up_mask, self.bits
+        return [site_id for site_id in sites if not up_mask & bits[site_id]]
+
+    def record(self, site_id):
+        """Count a read served by a site."""
+        self.served[site_id] += 1
@@ -0,0 +1,182 @@
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from EventSink import BufferedSink
+from Main import Main
+from TransactionManager import TransactionManager
+
+# One scenario of a suite file: its header name and lines (header included)
+Scenario = namedtuple("Scenario", ["name", "lines"])
+
+# Outcome of a scenario; status is "pass", "fail", "error" or "unchecked" (no expected output to check)
+ScenarioResult = namedtuple("ScenarioResult", ["name", "status", "seconds", "mismatches", "output"])
+
+HEADER_PATTERN = re.compile(r"//\s*(Test\s+\d+(?:\.\d+)?)\.?$")
+AT_SITE_PATTERN = re.compile(r"(x\d+):\s*(-?\d+)\s+at\s+site\s+(\d+)$")
+AT_ALL_SITES_PATTERN = re.compile(r"(x\d+):\s*(-?\d+)\s+at\s+all\s+sites$")
+INITIAL_VALUES_PATTERN = re.compile(r"all other variables have their initial values", re.IGNORECASE)
+
+
+def split_scenarios(lines):
+    """
+    Split a suite into scenarios at header lines holding only `// Test N`
+    (or `// Test N.M`), so comments that mention a test do not start one.
+    Lines before the first header are ignored.
+    """
+    scenarios = []
+    name = None
+    body = []
+    for line in lines:
+        match = HEADER_PATTERN.match(line.strip())
+        if match:
+            if name is not None:
+                scenarios.append(Scenario(name, body))
+            name = " ".join(match.group(1).split())
+            body = []
+        if name is not None:
+            body.append(line)
+    if name is not None:
+        scenarios.append(Scenario(name, body))
+    return scenarios
+
+
+def parse_expectations(lines):
+    """
+    Collect the expected final state from a scenario's `===` blocks, which run
+    until the next blank, comment or command line, as in CommandParser.
+    Returns (expected, rest_initial): expected maps (variable, site_id or None
+    for all home sites) -> value, and rest_initial is whether every variable not
+    mentioned must still hold its initial value. Unrecognised lines are notes.
+    """
+    expected = {}
+    rest_initial = False
+    in_block = False
+    match_command = Main.parser.COMMAND_PATTERN.match
+    converters = Main.parser.converters
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("//"):
+            in_block = False
+            continue
+        if line.startswith("==="):
+            in_block = True
+            continue
+        if not in_block:
+            continue
+        match = match_command(line)
+        if match and match.group(1) in converters:
+            in_block = False
+            continue
+        match = AT_SITE_PATTERN.match(line)
+        if match:
+            expected[match.group(1), int(match.group(3))] = int(match.group(2))
+            continue
+        match = AT_ALL_SITES_PATTERN.match(line)
+        if match:
+            expected[match.group(1), None] = int(match.group(2))
+            continue
+        if INITIAL_VALUES_PATTERN.search(line):
+            rest_initial = True
+    return expected, rest_initial
+
+
+def compare_state(transaction_manager, expected, rest_initial):
+    """Return a description of every way the final committed values differ from the expectations."""
+    placement = transaction_manager.placement
+    values = {site_id: site.variables for site_id, site in transaction_manager.sites.items()}
+    mismatches = []
+    for (variable, site_id), value in expected.items():
+        if variable not in placement:
+            mismatches.append(f"{variable} does not exist")
+            continue
+        sites = placement.sites_for(variable) if site_id is None else (site_id,)
+        for site in sites:
+            actual = values.get(site, {}).get(variable)
+            if actual != value:
+                mismatches.append(f"{variable} at site {site}: expected {value}, got {actual}")
+    if rest_initial:
+        mentioned = {variable for variable, _ in expected}
+        for variable, variable_placement in placement.placements.items():
+            if variable in mentioned:
+                continue
+            for site in variable_placement.sites:
+                actual = values[site].get(variable)
+                if actual != 10 * variable_placement.index:
+                    mismatches.append(f"{variable} at site {site}: expected initial value "
+                                      f"{10 * variable_placement.index}, got {actual}")
+    return mismatches
+
+
+def run_scenario(scenario):
+    """Replay one scenario on a fresh TransactionManager and check its final state."""
+    output = io.StringIO()
+    sink = BufferedSink(output)
+    expected, rest_initial = parse_expectations(scenario.lines)
+    started = time.perf_counter()
+    transaction_manager = TransactionManager(sink=sink)
+    try:
+        Main.run(transaction_manager, Main.parser.parse(scenario.lines))
+        if expected or rest_initial:
+            mismatches = compare_state(transaction_manager, expected, rest_initial)
+            status = "fail" if mismatches else "pass"
+        else:
+            mismatches = []
+            status = "unchecked"
+    except Exception as e:
+        mismatches = [f"Error: {e}"]
+        status = "error"
+    finally:
+        transaction_manager.close()
+        sink.flush()
+    return ScenarioResult(scenario.name, status, time.perf_counter() - started, mismatches, output.getvalue())
+
+
+def run_suite(scenarios, jobs=None):
+    """Run scenarios in a pool of jobs worker processes (all cores by default); jobs=1 runs them in-process."""
+    if jobs == 1 or len(scenarios) < 2:
+        return [run_scenario(scenario) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run_scenario, scenarios))
+
+
+def report(results, elapsed, verbose=False):
+    """Format scenario results as a human-readable table."""
+    lines = [f"{'scenario':<12}{'status':>10}{'time (ms)':>12}"]
+    for result in results:
+        lines.append(f"{result.name:<12}{result.status:>10}{result.seconds * 1e3:>12.2f}")
+        if result.status == "unchecked":
+            lines.append("    no `===` block, final state not checked")
+        for mismatch in result.mismatches:
+            lines.append(f"    {mismatch}")
+        if verbose and result.status in ("fail", "error"):
+            lines.extend(f"    | {line}" for line in result.output.splitlines())
+    counts = {status: sum(result.status == status for result in results)
+              for status in ("pass", "fail", "error", "unchecked")}
+    lines.append(f"{len(results)} scenarios: {counts['pass']} passed, {counts['fail']} failed, "
+                 f"{counts['error']} errors, {counts['unchecked']} unchecked, in {elapsed:.3f} s")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run each `// Test N` scenario of a suite file on a fresh "
+                                                 "TransactionManager and check it against its expected output.")
+    parser.add_argument("suite", nargs="?", default="testcases.txt", help="suite file to run")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help=f"worker processes (default: all {os.cpu_count()} cores; 1 runs serially)")
+    parser.add_argument("--verbose", action="store_true", help="print the event output of failing scenarios")
+    parser.add_argument("--strict", action="store_true",
+                        help="count scenarios without an expected `===` block as failures")
+    args = parser.parse_args()
+
+    with open(args.suite, "r") as file:
+        scenarios = split_scenarios(file)
+    started = time.perf_counter()
+    results = run_suite(scenarios, args.jobs)
+    print(report(results, time.perf_counter() - started, args.verbose))
+    succeeded = ("pass",) if args.strict else ("pass", "unchecked")
+    sys.exit(0 if all(result.status in succeeded for result in results) else 1)
@@ -0,0 +1,159 @@
+import multiprocessing
+from DataManager import DataManager
+
+
+def _shard_worker(connection, site_ids, placement):
+    """
+    Own the DataManagers of a group of sites in a worker process.
+    Each message is a batch of (site_id, method, args) requests; the reply is
+    the list of (ok, result) pairs, where result is the error message if not ok.
+    A request naming a plain attribute returns its value.
+    """
+    sites = {site_id: DataManager(site_id, placement) for site_id in site_ids}
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            break
+        results = []
+        for site_id, method, args in batch:
+            try:
+                result = getattr(sites[site_id], method)
+                if callable(result):
+                    result = result(*args)
+                results.append((True, result))
+            except Exception as e:
+                results.append((False, str(e)))
+        connection.send(results)
+    connection.close()
+
+
+class SiteShard:
+    def __init__(self, context, site_ids, placement):
+        """Start a worker process owning the given sites."""
+        self.site_ids = site_ids
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_shard_worker, args=(child_connection, site_ids, placement),
+                                       daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.pending = []  # Posted requests not sent yet
+        self.in_flight = 0  # Batches sent whose replies have not been read yet
+
+    def post(self, site_id, method, *args):
+        """Queue a request whose result is not needed; it is sent with the next batch."""
+        self.pending.append((site_id, method, args))
+
+    def send(self):
+        """Send the queued requests as one batch without waiting for the reply."""
+        if self.pending:
+            self.connection.send(self.pending)
+            self.pending = []
+            self.in_flight += 1
+
+    def drain(self):
+        """Wait for every batch in flight; raise the first error any request reported."""
+        result = None
+        error = None
+        while self.in_flight:
+            replies = self.connection.recv()
+            self.in_flight -= 1
+            for ok, result in replies:
+                if not ok and error is None:
+                    error = result
+        if error is not None:
+            raise Exception(error)
+        return result
+
+    def call(self, site_id, method, *args):
+        """Send a request together with any queued ones and return its result."""
+        self.drain()
+        self.post(site_id, method, *args)
+        self.send()
+        return self.drain()
+
+    def close(self):
+        try:
+            self.send()
+            self.drain()
+        finally:
+            self.connection.send(None)
+            self.process.join()
+            self.connection.close()
+
+
+class RemoteDataManager:
+    """Stand-in for a DataManager that lives in a shard process."""
+
+    def __init__(self, shard, site_id):
+        self.shard = shard
+        self.site_id = site_id
+
+    @property
+    def variables(self):
+        return self.shard.call(self.site_id, "variables")
+
+    def read(self, variable, start_time):
+        return self.shard.call(self.site_id, "read", variable, start_time)
+
+    def version_at_or_before(self, variable, time):
+        return self.shard.call(self.site_id, "version_at_or_before", variable, time)
+
+    def latest_commit_time(self, variable):
+        return self.shard.call(self.site_id, "latest_commit_time", variable)
+
+    def version_counts(self):
+        return self.shard.call(self.site_id, "version_counts")
+
+    def export_state(self):
+        return self.shard.call(self.site_id, "export_state")
+
+    def import_state(self, status, committed_after_recovery, histories):
+        self.shard.post(self.site_id, "import_state", status, committed_after_recovery, histories)
+
+    def write(self, variable, value, commit_time):
+        self.shard.post(self.site_id, "write", variable, value, commit_time)
+
+    def collect_garbage(self, horizon, variables=None):
+        self.shard.post(self.site_id, "collect_garbage", horizon, variables)
+
+    def fail(self):
+        self.shard.post(self.site_id, "fail")
+
+    def recover(self):
+        self.shard.post(self.site_id, "recover")
+
+
+class ShardedSites(dict):
+    def __init__(self, placement, num_shards):
+        """
+        Spread the sites of a placement over num_shards worker processes,
+        assigning contiguous runs of site ids to each shard.
+        Behaves like the site_id -> DataManager dict of a TransactionManager.
+        Requests that return nothing are batched per shard and only sent on
+        flush or on the shard's next synchronous call, so a commit's writes
+        reach all shards at once and are applied in parallel.
+        """
+        super().__init__()
+        site_ids = placement.site_ids
+        num_shards = max(1, min(num_shards, len(site_ids)))
+        context = multiprocessing.get_context()
+        size, extra = divmod(len(site_ids), num_shards)
+        self.shards = []
+        start = 0
+        for shard_index in range(num_shards):
+            end = start + size + (1 if shard_index < extra else 0)
+            shard = SiteShard(context, site_ids[start:end], placement)
+            self.shards.append(shard)
+            for site_id in site_ids[start:end]:
+                self[site_id] = RemoteDataManager(shard, site_id)
+            start = end
+
+    def flush(self):
+        """Send every queued request to its shard; the shards then work in parallel."""
+        for shard in self.shards:
+            shard.send()
+
+    def close(self):
+        """Wait for outstanding requests and stop the worker processes."""
+        for shard in self.shards:
+            shard.close()
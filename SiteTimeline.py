@@ -0,0 +1,49 @@
+from array import array
+from bisect import bisect_right
+
+
+class SiteTimeline:
+    __slots__ = ("event_times", "event_statuses", "failure_times", "recovery_times")
+
+    def __init__(self):
+        self.event_times = array("q")  # Times of all failure/recovery events, ascending
+        self.event_statuses = []  # event_statuses[i] is "down" or "up" for event_times[i]
+        self.failure_times = array("q")  # Times of "down" events, ascending
+        self.recovery_times = array("q")  # Times of "up" events, ascending
+
+    def __len__(self):
+        return len(self.event_times)
+
+    def record(self, timestamp, status):
+        """Record a failure ("down") or recovery ("up") event at the given time."""
+        index = bisect_right(self.event_times, timestamp)
+        self.event_times.insert(index, timestamp)
+        self.event_statuses.insert(index, status)
+        times = self.failure_times if status == "down" else self.recovery_times
+        times.insert(bisect_right(times, timestamp), timestamp)
+
+    def events(self):
+        """Return all events as a list of (timestamp, status) in time order."""
+        return list(zip(self.event_times, self.event_statuses))
+
+    @property
+    def last_recovery(self):
+        """Time of the most recent recovery, or None if the site never recovered."""
+        return self.recovery_times[-1] if self.recovery_times else None
+
+    def continuously_up(self, start, end):
+        """
+        Return True if no failure or recovery event happened strictly between
+        start and end, i.e. the site kept the state it had at start until end.
+        """
+        index = bisect_right(self.event_times, start)
+        return index == len(self.event_times) or self.event_times[index] >= end
+
+    def first_failure_after(self, timestamp):
+        """Return the time of the earliest failure strictly after the given time, or None."""
+        index = bisect_right(self.failure_times, timestamp)
+        return self.failure_times[index] if index < len(self.failure_times) else None
+
+    def failed_since(self, timestamp):
+        """Return True if the site failed strictly after the given time."""
+        return bool(self.failure_times) and self.failure_times[-1] > timestamp
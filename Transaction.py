@@ -1,23 +1,37 @@
+from collections import namedtuple
+
+# What is kept of a transaction after it ends
+TransactionSummary = namedtuple("TransactionSummary", ["transaction_id", "start_time", "end_time", "status"])
+
+
 class Transaction:
+    __slots__ = ("transaction_id", "start_time", "is_read_only", "read_set", "write_set", "status", "end_time",
+                 "snapshot")
+
     def __init__(self, transaction_id, start_time, is_read_only=False):
         self.transaction_id = transaction_id
         self.start_time = start_time  # Logical start time of the transaction
         self.is_read_only = is_read_only  # Whether the transaction is read-only
-        self.read_set = set()  # Variables read by this transaction
-        self.write_set = {}  # Variables written by this transaction: variable -> value
+        self.read_set = {}  # Variables read by this transaction: variable id -> version time read
+        self.write_set = {}  # Variables written by this transaction: variable id -> (value, timestamp)
         self.status = "active"  # Status of the transaction: "active", "committed", or "aborted"
+        self.end_time = None  # Logical time at which end() was processed, None while still running
+        # Read-only transactions only: variable id -> (value, site_id) already resolved for the pinned snapshot
+        self.snapshot = {} if is_read_only else None
 
-    def add_read(self, variable):
+    def add_read(self, variable_id, version_time):
         """
-        Add a variable to the transaction's read set.
-        Ensures no duplicate entries.
+        Add a variable to the transaction's read set with the version time it read.
+        Ensures no duplicate entries; the snapshot does not change, so the first version is kept.
         """
-        if variable not in self.read_set:
-            self.read_set.add(variable)
+        self.read_set.setdefault(variable_id, version_time)
 
-    def add_write(self, variable, value,timestamp):
+    def add_write(self, variable_id, value, timestamp):
         """
         Add a variable and its value to the transaction's write set.
         Overwrites any previous value for the same variable in the write set.
         """
-        self.write_set[variable] = [value,timestamp]
+        self.write_set[variable_id] = (value, timestamp)
+
+    def summary(self):
+        return TransactionSummary(self.transaction_id, self.start_time, self.end_time, self.status)
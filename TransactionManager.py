@@ -1,31 +1,65 @@
+import os
+from collections import deque
 from Transaction import Transaction
 from DataManager import DataManager
+from SiteTimeline import SiteTimeline
+from PlacementCatalog import PlacementCatalog
+from WaitQueue import WaitQueue
+from ReplicaSelector import ReplicaSelector
+from ConflictGraph import ConflictGraph
+from EventSink import ConsoleSink
+from WriteAheadLog import WriteAheadLog
+from Checkpoint import Checkpoint
 
 class TransactionManager:
-    def __init__(self):
-        self.sites = {i: DataManager(i) for i in range(1, 11)}  # 10 sites, indexed 1 to 10
+    def __init__(self, num_sites=10, num_variables=20, sink=None, shards=0, history_limit=1024,
+                 replica_policy="ordered", replica_costs=None):
+        self.sink = sink if sink is not None else ConsoleSink()  # Receives begin/read/write/commit/abort/dump events
+        self.placement = PlacementCatalog(num_sites, num_variables)  # Variable -> integer id, replicated flag, home sites
+        site_ids = self.placement.site_ids
+        if shards:
+            # Run the DataManagers in worker processes, a group of sites per process
+            from ShardedSites import ShardedSites
+            self.shards = ShardedSites(self.placement, shards)
+            self.sites = self.shards
+        else:
+            self.shards = None
+            self.sites = {i: DataManager(i, self.placement) for i in site_ids}  # Sites indexed 1 to num_sites
         self.transactions = {}  # Active transactions: transaction_id -> Transaction object
-        self.site_status = {i: "up" for i in range(1, 11)}  # Site status: "up"/"down"
-        self.failure_history = {i: [] for i in range(1, 11)}  # Failure history: site_id -> list of failure/recovery events
-        self.waiting_read_queue = []  # Queue for waiting reads: list of (transaction_id, variable, site_id)
+        self.finished = deque(maxlen=history_limit)  # TransactionSummary of the most recently ended transactions
+        self.site_status = {i: "up" for i in site_ids}  # Site status: "up"/"down"
+        self.replicas = ReplicaSelector(site_ids, replica_policy, replica_costs)  # Up-site bitmap and read routing
+        self.failure_history = {i: SiteTimeline() for i in site_ids}  # Failure history: site_id -> SiteTimeline of failure/recovery events
+        self.failure_log = SiteTimeline()  # Failures of any site, for replicated variables
+        self.last_commit_time = {}  # variable -> commit time of its newest committed version
+        self.wait_queue = WaitQueue()  # Blocked reads, indexed by site and by transaction
+        self.conflicts = ConflictGraph()  # rw/wr/ww edges between committed transactions, for SSI
+        self.wal = None  # WriteAheadLog of committed writes and site events, if persistence is on
+        self.checkpoint_path = None  # Where periodic checkpoints are written
+        self.checkpoint_every = 0  # Commits between checkpoints, 0 for none
+        self.reload_on_recover = False  # Rebuild a recovering site from the checkpoint and log
+        self.commits_since_checkpoint = 0
+        self.clock = 0  # Latest logical timestamp of a commit or site event
+        self.metrics = None  # Metrics collected since enable_metrics, if any
+        self.dump_lines = {}  # site_id -> formatted dump line, dropped when the site changes
+        self.dump_changes = {}  # site_id -> variables written since the last full or delta dump
 
         # Initialize data variables
         self.initialize_data()
 
     def initialize_data(self):
-        """Initialize the 20 variables across the 10 sites based on their index."""
-        for i in range(1, 21):  # Variables x1 to x20
-            initial_value = 10 * i
-            if i % 2 == 0:  # Even-indexed variables
-                for site_id in self.sites:
-                    self.sites[site_id].write(f"x{i}", initial_value, 0)
-            else:  # Odd-indexed variables
-                site_id = 1 + (i % 10)
-                self.sites[site_id].write(f"x{i}", initial_value, 0)
+        """Initialize every variable at its home sites with 10 times its index."""
+        for variable, placement in self.placement.placements.items():
+            initial_value = 10 * placement.index
+            for site_id in placement.sites:
+                self.sites[site_id].write(variable, initial_value, 0)
+            self.last_commit_time[variable] = 0
+        if self.shards is not None:
+            self.shards.flush()
 
     def start_transaction(self, transaction_id, timestamp, is_read_only=False):
         """Begin a new transaction."""
-        print(f"Starting {'read-only ' if is_read_only else ''}transaction T{transaction_id} at timestamp {timestamp}.")
+        self.sink.emit("begin", transaction=transaction_id, timestamp=timestamp, read_only=is_read_only)
         self.transactions[transaction_id] = Transaction(transaction_id, timestamp, is_read_only)
 
     def read_intention(self, transaction_id, variable):
@@ -39,69 +73,60 @@ class TransactionManager:
 
         transaction = self.transactions[transaction_id]
 
-        # Add the variable to the transaction's read set
-        transaction.add_read(variable)
-
         # Determine the sites where the variable is stored
-        sites_to_read = []
-        variable_index = int(variable[1:])  # Extract the numeric part of the variable name
-
-        if variable_index % 2 == 0:
-            # Even-indexed variables (replicated): available on all sites
-            sites_to_read = [site_id for site_id, site in self.sites.items()]
-        else:
-            # Odd-indexed variables (non-replicated): stored on a single site
-            site_id = 1 + (variable_index % 10)
-            
-            sites_to_read = [site_id]
-
-        # Attempt to read from the available sites
-        for site_id in sites_to_read:
-            if self.site_status[site_id] == "up":
-                try:
-                    # Calculate the last commit time for the variable
-                    last_commit_time = None
-                    for value, commit_time in reversed(self.sites[site_id].version_history[variable]):
-                        if commit_time <= transaction.start_time:
-                            last_commit_time = commit_time
-                            break
-
-                    # Check failure history before attempting the read
-                    if last_commit_time is not None:
-                        for failure_time, status in self.failure_history[site_id]:
-                            if last_commit_time < failure_time < transaction.start_time:
-                                #print(f"Skipping Site {site_id} for {variable}: Last commit time {last_commit_time} is invalid "
-                                #    f"due to failure at {failure_time}.")
-                                raise Exception("Site not functional during required period.")
-                    
-                    # Attempt to read from the site
-                    value = self.sites[site_id].read(variable, transaction.start_time)
-                    print(f"Transaction T{transaction_id} read {variable}:{value} from Site {site_id}.")
-                    return value  # Return the first successful read
-                except Exception as e:
-                    pass
-                    #print(f"Transaction T{transaction_id} failed to read {variable} from Site {site_id}: {e}")
-            else:
-                try:
-                    # Calculate the last commit time for the variable
-                    last_commit_time = None
-                    for value, commit_time in reversed(self.sites[site_id].version_history[variable]):
-                        if commit_time <= transaction.start_time:
-                            last_commit_time = commit_time
-                            break
-
-                    # Check failure history before attempting the read
-                    if last_commit_time is not None:
-                        for failure_time, status in self.failure_history[site_id]:
-                            if last_commit_time < failure_time < transaction.start_time:
-                                #print(f"Skipping Site {site_id} for {variable}: Last commit time {last_commit_time} is invalid "
-                                #    f"due to failure at {failure_time}.")
-                                raise Exception("Site not functional during required period.")
-                    
-                    self.waiting_read_queue.append([transaction_id, variable_index,site_id])
-                    return 
-                except Exception as e:
-                    pass
+        placement = self.placement[variable]
+
+        snapshot = transaction.snapshot
+        if snapshot is not None:
+            # Read-only: the snapshot never changes, so a resolved version is final
+            cached = snapshot.get(placement.index)
+            if cached is not None:
+                self.sink.emit("read", transaction=transaction_id, variable=variable, value=cached[0], site=cached[1])
+                return cached[0]
+        replicas = self.replicas
+
+        # Attempt to read from the up sites, in the order chosen by the replica policy
+        for site_id in replicas.candidates(placement.sites):
+            try:
+                # Calculate the last commit time for the variable
+                version = self.sites[site_id].version_at_or_before(variable, transaction.start_time)
+                last_commit_time = version[1] if version is not None else None
+
+                # Check failure history before attempting the read
+                if last_commit_time is not None:
+                    if not self.failure_history[site_id].continuously_up(last_commit_time, transaction.start_time):
+                        raise Exception("Site not functional during required period.")
+
+                # Attempt to read from the site
+                value = self.sites[site_id].read(variable, transaction.start_time)
+                replicas.record(site_id)
+                if snapshot is not None:
+                    snapshot[placement.index] = (value, site_id)
+                else:
+                    # Add the variable and the version read to the transaction's read set
+                    transaction.add_read(placement.index, last_commit_time)
+                self.sink.emit("read", transaction=transaction_id, variable=variable, value=value, site=site_id)
+                return value  # Return the first successful read
+            except Exception as e:
+                pass
+                #print(f"Transaction T{transaction_id} failed to read {variable} from Site {site_id}: {e}")
+
+        # Every up replica has been ruled out: wait for a down site that holds a valid version
+        for site_id in replicas.down(placement.sites):
+            try:
+                # Calculate the last commit time for the variable
+                version = self.sites[site_id].version_at_or_before(variable, transaction.start_time)
+                last_commit_time = version[1] if version is not None else None
+
+                # Check failure history before attempting the read
+                if last_commit_time is not None:
+                    if not self.failure_history[site_id].continuously_up(last_commit_time, transaction.start_time):
+                        raise Exception("Site not functional during required period.")
+
+                self.wait_queue.add(transaction_id, variable, site_id)
+                return
+            except Exception as e:
+                pass
 
         '''
         for site_id, site in self.sites.items():
@@ -124,8 +149,8 @@ class TransactionManager:
                         return value
         '''
 # If no valid site can provide the value, abort the transaction
-        print(f"Transaction T{transaction_id} aborted: No valid site could provide the value for {variable}.")
-        transaction.status = "aborted"
+        self.sink.emit("abort", transaction=transaction_id, reason="no_valid_site", variable=variable)
+        self.end_transaction(transaction, "aborted")
         return None
 
 
@@ -138,7 +163,13 @@ class TransactionManager:
             raise Exception(f"Transaction T{transaction_id} does not exist.")
         
         transaction = self.transactions[transaction_id]
-        transaction.add_write(variable, value,timestamp)
+        if transaction.is_read_only:
+            # A read-only transaction that writes is aborted; the replay carries on
+            if transaction.status == "active":
+                self.sink.emit("abort", transaction=transaction_id, reason="read_only_write", variable=variable)
+                self.end_transaction(transaction, "aborted")
+            return
+        transaction.add_write(self.placement.index(variable), value, timestamp)
         #print(f"Transaction T{transaction_id} added write intention for {variable} = {value}.")
 
     def commit(self, transaction_id,time):
@@ -146,33 +177,74 @@ class TransactionManager:
         Commit a transaction after validation.
         Implements:
         1. First Committer Wins rule.
-        2. Abort if any write timestamp precedes the failure timestamp of a site.
+        2. Abort if any write timestamp precedes the failure timestamp of one of the
+           written variable's home sites.
+        3. Serializable snapshot isolation: abort if committing would close a cycle
+           in the conflict graph.
+        Returns the final status, "committed" or "aborted".
         """
         if transaction_id not in self.transactions:
             raise Exception(f"Transaction T{transaction_id} does not exist.")
 
         transaction = self.transactions[transaction_id]
+        transaction.end_time = time
+
+        if transaction.status != "active":
+            # Already aborted, e.g. by a read no site could serve: nothing is validated or written
+            self.end_transaction(transaction, transaction.status, retire=True)
+            return transaction.status
+
+        if transaction.is_read_only:
+            # Read-only transactions saw a consistent snapshot and wrote nothing: no validation
+            self.end_transaction(transaction, "committed", retire=True)
+            self.sink.emit("commit", transaction=transaction_id)
+            return transaction.status
 
         # Check for First Committer Wins violation and failure timestamp validation
-        for variable, (value, write_timestamp) in transaction.write_set.items():
-            for site_id, site in self.sites.items():
-                if self.site_status[site_id] == "up" and (variable in site.variables or variable.startswith("x")):
+        name = self.placement.name
+        for variable_id, (value, write_timestamp) in transaction.write_set.items():
+            variable = name(variable_id)
+            # Neither a newer commit of the variable anywhere nor a failure of one of
+            # its sites since the write: nothing per-site can fail either
+            if (self.last_commit_time[variable] <= transaction.start_time
+                    and self.first_failure_after(variable, write_timestamp) is None):
+                continue
+
+            # Only the variable's home sites can lose its write
+            for site_id in self.placement.sites_for(variable):
+                if self.site_status[site_id] == "up":
                     # First Committer Wins Check
-                    if variable in site.version_history:
-                        last_commit_time = site.version_history[variable][-1][1]
-                        if last_commit_time > transaction.start_time:
-                            print(f"Transaction T{transaction_id} aborted: {variable} was committed at {last_commit_time}, "
-                                f"after transaction start time {transaction.start_time}.")
-                            transaction.status = "aborted"
-                            return
-                    
+                    last_commit_time = self.sites[site_id].latest_commit_time(variable)
+                    if last_commit_time is not None and last_commit_time > transaction.start_time:
+                        self.sink.emit("abort", transaction=transaction_id, reason="first_committer_wins",
+                                       variable=variable, commit_time=last_commit_time,
+                                       start_time=transaction.start_time)
+                        self.end_transaction(transaction, "aborted", retire=True)
+                        return transaction.status
+
                 # Failure Timestamp Validation
-                for failure_timestamp, status in self.failure_history[site_id]:
-                    if status == "down" and write_timestamp < failure_timestamp:
-                        print(f"Transaction T{transaction_id} aborted: Write timestamp {write_timestamp} for {variable} "
-                            f"precedes failure timestamp {failure_timestamp} on Site {site_id}.")
-                        transaction.status = "aborted"
-                        return
+                failure_timestamp = self.failure_history[site_id].first_failure_after(write_timestamp)
+                if failure_timestamp is not None:
+                    self.sink.emit("abort", transaction=transaction_id, reason="failure", variable=variable,
+                                   write_time=write_timestamp, failure_time=failure_timestamp, site=site_id)
+                    self.end_transaction(transaction, "aborted", retire=True)
+                    return transaction.status
+
+        # Serializable Snapshot Isolation Check
+        conflicts = self.conflicts
+        read_set = transaction.read_set
+        # Each write replaces the newest committed version of its variable
+        write_versions = {variable_id: (write_timestamp, self.last_commit_time[name(variable_id)])
+                          for variable_id, (value, write_timestamp) in transaction.write_set.items()}
+        if read_set or write_versions:
+            incoming, outgoing = conflicts.edges_for(read_set, write_versions)
+            if incoming and outgoing:
+                cycle = conflicts.find_cycle(incoming, outgoing)
+                if cycle is not None:
+                    self.sink.emit("abort", transaction=transaction_id, reason="cycle",
+                                   cycle=[transaction_id] + [conflicts.nodes[node].transaction_id for node in cycle])
+                    self.end_transaction(transaction, "aborted", retire=True)
+                    return transaction.status
 
         # Process all read intentions (optional logging for debug)
         #for variable in transaction.read_set:
@@ -181,58 +253,287 @@ class TransactionManager:
         # Process all write intentions
         # Initialize a set to track written sites
 
-        for variable, (value, write_timestamp) in transaction.write_set.items():
-            # Distribute writes to the appropriate sites
-            written_sites = set()
-            variable_index = int(variable[1:])  # Extract the numeric part of the variable name
-
-            if variable_index % 2 == 0:
-                # Even-indexed variables: Write to all sites that are up
-                for site_id, site in self.sites.items():
-                    if self.site_status[site_id] == "up" and variable in site.variables:
-                        # Retrieve the last recovery timestamp
-                        last_recovery_time = max(
-                            (timestamp for timestamp, status in self.failure_history[site_id] if status == "up"),
-                            default=None
-                        )
-
-                        # Check if the write timestamp is valid
-                        if last_recovery_time is not None and write_timestamp < last_recovery_time:
-                            continue
-
-                        # Perform the write and track the site
-                        site.write(variable, value, write_timestamp)
-                        written_sites.add(site_id)
-            else:
-                # Odd-indexed variables: Write to a single designated site
-                site_id = 1 + (variable_index % 10)
-                if self.site_status[site_id] == "up" and variable in self.sites[site_id].variables:
+        planned_writes = []  # (variable, value, write_timestamp, sites to write)
+        for variable_id, (value, write_timestamp) in transaction.write_set.items():
+            variable = name(variable_id)
+            # Distribute writes to the home sites that are up
+            written_sites = []
+            for site_id in self.placement.sites_for(variable):
+                if self.site_status[site_id] == "up":
                     # Retrieve the last recovery timestamp
-                    last_recovery_time = max(
-                        (timestamp for timestamp, status in self.failure_history[site_id] if status == "up"),
-                        default=None
-                    )
+                    last_recovery_time = self.failure_history[site_id].last_recovery
 
                     # Check if the write timestamp is valid
                     if last_recovery_time is not None and write_timestamp < last_recovery_time:
                         continue
-
-                    # Perform the write and track the site
-                    self.sites[site_id].write(variable, value, write_timestamp)
-                    written_sites.add(site_id)
-
-            # Print the sites written to in a single line
+                    written_sites.append(site_id)
+            planned_writes.append((variable, value, write_timestamp, written_sites))
+
+        # Log the whole write set as one record before applying it
+        self.clock = max(self.clock, time)
+        if self.wal is not None:
+            self.wal.log_commit(transaction_id, time, [
+                (site_id, self.placement.index(variable), value, write_timestamp)
+                for variable, value, write_timestamp, written_sites in planned_writes
+                for site_id in written_sites
+            ])
+
+        for variable, value, write_timestamp, written_sites in planned_writes:
+            # Perform the writes
+            for site_id in written_sites:
+                self.sites[site_id].write(variable, value, write_timestamp)
+                self.mark_dirty(site_id, variable)
+
+            # Report the sites written to in a single event
             if written_sites:
+                if write_timestamp > self.last_commit_time.get(variable, write_timestamp - 1):
+                    self.last_commit_time[variable] = write_timestamp
                 written_sites_list = sorted(written_sites)  # Sort for consistent output
-                print(f"Transaction T{transaction_id} wrote {variable} to sites: {', '.join(map(str, written_sites_list))}")
+                self.sink.emit("write", transaction=transaction_id, variable=variable, sites=written_sites_list)
 
 
 
         # Mark the transaction as committed
-        transaction.status = "committed"
-        print(f"Transaction T{transaction_id} has been committed.")
+        if read_set or write_versions:
+            conflicts.add(transaction_id, transaction.start_time, time, read_set, write_versions, incoming, outgoing)
+        self.end_transaction(transaction, "committed", retire=True)
+        self.sink.emit("commit", transaction=transaction_id)
+        conflicts.maybe_prune(self.horizon(time))
+
+        # Drop versions of the written variables that no active snapshot can read
+        self.collect_garbage(time, [name(variable_id) for variable_id in transaction.write_set])
+        if self.shards is not None:
+            # Fan the batched writes out to all shards at once
+            self.shards.flush()
+
+        if self.checkpoint_every:
+            self.commits_since_checkpoint += 1
+            if self.commits_since_checkpoint >= self.checkpoint_every:
+                self.save_checkpoint()
+        return transaction.status
+
+
+    def first_failure_after(self, variable, timestamp):
+        """
+        Return (site_id, failure_time) for the first home site of a variable, in
+        site order, that failed after the given time, or None if none did.
+        """
+        sites = self.placement.sites_for(variable)
+        if len(sites) == len(self.sites):
+            if not self.failure_log.failed_since(timestamp):
+                return None  # Replicated everywhere and no site failed since
+        for site_id in sites:
+            failure_timestamp = self.failure_history[site_id].first_failure_after(timestamp)
+            if failure_timestamp is not None:
+                return site_id, failure_timestamp
+        return None
+
+    def close(self):
+        """Stop the shard processes and close the log, if any. The manager cannot be used afterwards."""
+        if self.shards is not None:
+            self.shards.close()
+        if self.wal is not None:
+            self.wal.close()
+
+    def enable_metrics(self):
+        """
+        Start timing the hot paths and counting events and aborts by reason.
+        Only this instance is instrumented; without it there is no overhead.
+        """
+        if self.metrics is None:
+            from Metrics import Metrics
+            self.metrics = Metrics()
+            self.metrics.attach(self)
+        return self.metrics
 
+    def stats(self):
+        """
+        Return a snapshot of the manager's state as a dict: active transactions,
+        waiting reads, conflict graph size, and the status, waiting reads and
+        version chain lengths of every site, plus the collected metrics if enabled.
+        """
+        sites = {}
+        for site_id, site in self.sites.items():
+            counts = site.version_counts()
+            sites[site_id] = {
+                "status": self.site_status[site_id],
+                "waiting_reads": self.wait_queue.waiting_on(site_id),
+                "versions": sum(counts.values()),
+                "longest_chain": max(counts.values(), default=0),
+                "chains": counts,
+            }
+        stats = {
+            "active_transactions": sum(t.status == "active" for t in self.transactions.values()),
+            "wait_queue": len(self.wait_queue),
+            "conflict_graph": len(self.conflicts),
+            "sites": sites,
+        }
+        if self.metrics is not None:
+            stats["metrics"] = self.metrics.snapshot()
+        return stats
+
+    def enable_persistence(self, wal_path, checkpoint_path=None, checkpoint_every=0, sync=False,
+                           reload_on_recover=False):
+        """
+        Log every commit and site event to an append-only write-ahead log, and
+        write a checkpoint every checkpoint_every commits if a path is given.
+        With reload_on_recover, a recovering site's data is rebuilt from the
+        checkpoint and the log instead of kept from memory, as after a crash.
+        """
+        self.wal = WriteAheadLog(wal_path, sync)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every if checkpoint_path else 0
+        self.reload_on_recover = reload_on_recover
+
+    def log_site_event(self, site_id, timestamp, status):
+        self.clock = max(self.clock, timestamp)
+        if self.wal is not None:
+            self.wal.log_site(site_id, timestamp, status)
+
+    def save_checkpoint(self, path=None):
+        """Write the committed state of every site; the log tail after it is replayed on restore."""
+        path = path or self.checkpoint_path
+        sites = {}
+        for site_id, site in self.sites.items():
+            status, committed_after_recovery, histories = site.export_state()
+            sites[site_id] = (status, committed_after_recovery, histories, self.failure_history[site_id].events())
+        wal_offset = self.wal.tell() if self.wal is not None else 0
+        checkpoint = Checkpoint(self.placement.num_sites, self.placement.num_variables, self.clock, wal_offset,
+                                sites, self.last_commit_time)
+        checkpoint.save(path, self.placement)
+        self.commits_since_checkpoint = 0
+
+    def restore(self, checkpoint_path=None, wal_path=None):
+        """
+        Rebuild committed state from the latest checkpoint plus the log tail after it.
+        Either may be missing: without a checkpoint the whole log is replayed on top
+        of the initial data. Must be called before any transaction starts and before
+        enable_persistence. Returns the last logical timestamp restored.
+        """
+        offset = 0
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            checkpoint = Checkpoint.load(checkpoint_path, self.placement)
+            self.failure_log = SiteTimeline()
+            for site_id, (status, committed_after_recovery, histories, events) in checkpoint.sites.items():
+                self.sites[site_id].import_state(status, committed_after_recovery, histories)
+                self.site_status[site_id] = status
+                self.replicas.mark(site_id, status)
+                self.failure_history[site_id] = SiteTimeline()
+                for timestamp, event_status in events:
+                    self.failure_history[site_id].record(timestamp, event_status)
+                    if event_status == "down":
+                        self.failure_log.record(timestamp, event_status)
+            self.last_commit_time = dict(checkpoint.last_commit_time)
+            self.clock = checkpoint.clock
+            offset = checkpoint.wal_offset
+
+        if wal_path:
+            for record in WriteAheadLog.records(wal_path, offset):
+                self._replay(record)
+        if self.shards is not None:
+            self.shards.flush()
+        for site_id in self.sites:
+            self.mark_dirty(site_id, *self.placement.variables_at(site_id))
+        return self.clock
+
+    def _replay(self, record, site_ids=None):
+        """Apply a write-ahead log record without emitting events, optionally only for some sites."""
+        kind = record[0]
+        if kind == "commit":
+            _, transaction_id, commit_time, writes, _ = record
+            for site_id, index, value, write_timestamp in writes:
+                if site_ids is not None and site_id not in site_ids:
+                    continue
+                variable = self.placement.name(index)
+                self.sites[site_id].write(variable, value, write_timestamp)
+                if write_timestamp > self.last_commit_time.get(variable, write_timestamp - 1):
+                    self.last_commit_time[variable] = write_timestamp
+            self.clock = max(self.clock, commit_time)
+        else:
+            _, site_id, timestamp, status, _ = record
+            self.clock = max(self.clock, timestamp)
+            if site_ids is not None and site_id not in site_ids:
+                return
+            if status == "down":
+                self.sites[site_id].fail()
+                self.failure_log.record(timestamp, status)
+            else:
+                self.sites[site_id].recover()
+            self.failure_history[site_id].record(timestamp, status)
+            self.site_status[site_id] = status
+            self.replicas.mark(site_id, status)
 
+    def reload_site(self, site_id):
+        """
+        Rebuild one site's data from the checkpoint and the log tail, leaving every
+        other site alone. Used on recovery with reload_on_recover, so a failed site's
+        state comes back without replaying the whole trace.
+        """
+        if self.wal is None:
+            raise Exception("Persistence is not enabled.")
+        offset = 0
+        state = None
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            checkpoint = Checkpoint.load(self.checkpoint_path, self.placement)
+            state = checkpoint.sites[site_id][:3]
+            offset = checkpoint.wal_offset
+
+        # Replay into a scratch DataManager so the live site's timeline is untouched
+        site = DataManager(site_id, self.placement)
+        if state is not None:
+            site.import_state(*state)
+        else:
+            for variable in self.placement.variables_at(site_id):
+                site.write(variable, 10 * self.placement.index(variable), 0)
+        for record in WriteAheadLog.records(self.wal.path, offset):
+            if record[0] == "commit":
+                for write_site, index, value, write_timestamp in record[3]:
+                    if write_site == site_id:
+                        site.write(self.placement.name(index), value, write_timestamp)
+            elif record[1] == site_id:
+                if record[3] == "down":
+                    site.fail()
+                else:
+                    site.recover()
+        self.sites[site_id].import_state(*site.export_state())
+        self.mark_dirty(site_id, *self.placement.variables_at(site_id))
+
+    def end_transaction(self, transaction, status, retire=False):
+        """
+        Mark a transaction committed or aborted and drop the reads it is still waiting on.
+        With retire, the transaction is also replaced by a summary in the bounded
+        history of finished transactions; snapshots read from the version store,
+        so nothing depends on the Transaction object once end() has run.
+        """
+        transaction.status = status
+        self.wait_queue.cancel(transaction.transaction_id)
+        if retire:
+            self.finished.append(transaction.summary())
+            if self.transactions.get(transaction.transaction_id) is transaction:
+                del self.transactions[transaction.transaction_id]
+
+    def horizon(self, time):
+        """Return the start time of the oldest active transaction, or the given time if there is none."""
+        return min(
+            (t.start_time for t in self.transactions.values()),
+            default=time
+        )
+
+    def collect_garbage(self, time, variables=None):
+        """
+        Drop versions older than the start time of the oldest active transaction.
+        With no active transactions, only the latest version at or before the
+        given time is kept. Only the given variables are collected if provided,
+        and only at their home sites.
+        """
+        horizon = self.horizon(time)
+        if variables is None:
+            for site in self.sites.values():
+                site.collect_garbage(horizon)
+            return
+        for variable in variables:
+            for site_id in self.placement.sites_for(variable):
+                self.sites[site_id].collect_garbage(horizon, (variable,))
 
     def update_site_status(self, site_id, status, timestamp):
         """
@@ -245,32 +546,46 @@ class TransactionManager:
         if status == "down":
             if self.site_status[site_id] != "down":
                 self.sites[site_id].fail()
-                self.failure_history[site_id].append((timestamp, "down"))
+                self.failure_history[site_id].record(timestamp, "down")
+                self.failure_log.record(timestamp, "down")
                 self.site_status[site_id] = status
+                self.mark_dirty(site_id)
+                self.log_site_event(site_id, timestamp, status)
         elif status == "up":
             if self.site_status[site_id] != "up":
                 # Recover the site
+                if self.reload_on_recover:
+                    self.reload_site(site_id)
                 self.sites[site_id].recover()
-                self.failure_history[site_id].append((timestamp, "up"))
+                self.failure_history[site_id].record(timestamp, "up")
                 self.site_status[site_id] = status
-                print(f"Site {site_id} has been recovered.")
-
-                # Process the waiting read queue
-                for entry in list(self.waiting_read_queue):  # Use a copy to allow modification during iteration
-                    transaction_id, variable_index, waiting_site_id = entry
-                    if waiting_site_id == site_id:  # Check if the recovered site matches the waiting read site
-                        variable = f"x{variable_index}"  # Convert the variable index back to its name
-                        try:
-                            value = self.sites[site_id].read(variable, self.transactions[transaction_id].start_time)
-                            print(f"Transaction T{transaction_id} read {variable}:{value} from recovered Site {site_id}.")
-                            # Remove the entry from the queue since it has been processed
-                            self.waiting_read_queue.remove(entry)
-                        except Exception as e:
-                            print(f"Transaction T{transaction_id} failed to read {variable} from recovered Site {site_id}: {e}")
-
-                
-                
+                self.mark_dirty(site_id)
+                self.log_site_event(site_id, timestamp, status)
+                self.sink.emit("recover", site=site_id)
+
+                # Wake only the reads waiting on this site
+                for entry in self.wait_queue.take(site_id):
+                    transaction_id, variable = entry.transaction_id, entry.variable
+                    try:
+                        transaction = self.transactions[transaction_id]
+                        value = self.sites[site_id].read(variable, transaction.start_time)
+                        self.replicas.record(site_id)
+                        if transaction.snapshot is not None:
+                            transaction.snapshot[self.placement.index(variable)] = (value, site_id)
+                        else:
+                            version_time = self.sites[site_id].version_at_or_before(variable, transaction.start_time)[1]
+                            transaction.add_read(self.placement.index(variable), version_time)
+                        self.sink.emit("wake_read", transaction=transaction_id, variable=variable, value=value,
+                                       site=site_id)
+                        entry.notify(value)
+                    except Exception as e:
+                        self.sink.emit("wake_failed", transaction=transaction_id, variable=variable, site=site_id,
+                                       error=str(e))
+                        # Keep waiting for a later recovery
+                        self.wait_queue.requeue(entry)
+
         self.site_status[site_id] = status
+        self.replicas.mark(site_id, status)
         #print(f"Site {site_id} status updated to {status} at timestamp {timestamp}.")
 
     def get_failure_history(self, site_id):
@@ -279,23 +594,72 @@ class TransactionManager:
         """
         if site_id not in self.failure_history:
             raise Exception(f"Site {site_id} does not exist.")
-        return self.failure_history[site_id]
-
-    def querystate(self):
-        """Print the current state of the system for debugging."""
-        print("\n--- Dump State ---")
-        for site_id, dm in self.sites.items():
-            # Sort variables by the numeric part of their names
-            sorted_variables = sorted(dm.variables.items(), key=lambda item: int(item[0][1:]))
-
-            # Format variable-value pairs as a string
-            site_data = ", ".join(f"{var}: {val}" for var, val in sorted_variables)
-
-            # Check the site status and include it in the output
-            if self.site_status[site_id] == "down":
-                print(f"site {site_id} (down) – {site_data}")
-            else:
-                print(f"site {site_id} – {site_data}")
-        print("--------------------")
+        return self.failure_history[site_id].events()
+
+    def mark_dirty(self, site_id, *variables):
+        """Record that a site's status or the given variables at it changed since the last dump."""
+        self.dump_lines.pop(site_id, None)
+        changed = self.dump_changes.get(site_id)
+        if changed is None:
+            changed = self.dump_changes[site_id] = set()
+        changed.update(variables)
+
+    def _site_label(self, site_id):
+        # Check the site status and include it in the output
+        if self.site_status[site_id] == "down":
+            return f"site {site_id} (down)"
+        return f"site {site_id}"
+
+    def _dump_line(self, site_id):
+        """Return the dump line of a site, formatting it only if the site changed since it was last formatted."""
+        line = self.dump_lines.get(site_id)
+        if line is None:
+            values = self.sites[site_id].variables
+            # Format variable-value pairs as a string, in the site's presorted variable order
+            site_data = ", ".join(f"{var}: {values[var]}" for var in self.placement.variables_at(site_id)
+                                  if var in values)
+            line = self.dump_lines[site_id] = f"{self._site_label(site_id)} – {site_data}"
+        return line
+
+    def querystate(self, target=None):
+        """
+        Report the current state of the system for debugging.
+        - No target: every site; only sites that changed since the last dump are reformatted.
+        - "delta": only the values written, and the sites whose status changed, since the
+          last full or delta dump.
+        - A variable name: its value at each of its home sites.
+        - A site id: that site only.
+        An unknown site or variable is reported with a dump_failed event and the replay
+        carries on. Returns True if the state was dumped.
+        """
+        if target is None:
+            lines = [self._dump_line(site_id) for site_id in self.sites]
+            self.dump_changes = {}
+        elif target == "delta":
+            lines = []
+            for site_id in sorted(self.dump_changes):
+                changed = self.dump_changes[site_id]
+                if not changed:
+                    lines.append(self._site_label(site_id))
+                    continue
+                values = self.sites[site_id].variables
+                site_data = ", ".join(f"{var}: {values[var]}" for var in self.placement.variables_at(site_id)
+                                      if var in changed and var in values)
+                lines.append(f"{self._site_label(site_id)} – {site_data}")
+            self.dump_changes = {}
+        elif isinstance(target, int):
+            if target not in self.sites:
+                self.sink.emit("dump_failed", target=target, error=f"Site {target} does not exist.")
+                return False
+            lines = [self._dump_line(target)]
+        else:
+            if target not in self.placement:
+                self.sink.emit("dump_failed", target=target, error=f"Variable {target} does not exist.")
+                return False
+            site_data = ", ".join(f"{self._site_label(site_id)}: {self.sites[site_id].variables[target]}"
+                                  for site_id in self.placement.sites_for(target))
+            lines = [f"{target} – {site_data}"]
+        self.sink.emit("dump", lines=lines)
+        return True
 
 
@@ -0,0 +1,72 @@
+from array import array
+from bisect import bisect_right
+
+
+class VersionChain:
+    __slots__ = ("commit_times", "values")
+
+    def __init__(self):
+        self.commit_times = array("q")  # Commit times, kept in ascending order
+        self.values = []  # values[i] is the value committed at commit_times[i]
+
+    @classmethod
+    def from_arrays(cls, commit_times, values):
+        """Build a chain from ascending commit times and their values."""
+        chain = cls()
+        chain.commit_times = array("q", commit_times)
+        chain.values = list(values)
+        return chain
+
+    def __len__(self):
+        return len(self.commit_times)
+
+    def append(self, value, commit_time):
+        """
+        Add a new version.
+        Versions normally arrive in commit order; an out-of-order version is
+        inserted after any existing version with the same commit time.
+        """
+        times = self.commit_times
+        if not times or times[-1] <= commit_time:
+            times.append(commit_time)
+            self.values.append(value)
+        else:
+            index = bisect_right(times, commit_time)
+            times.insert(index, commit_time)
+            self.values.insert(index, value)
+
+    def at_or_before(self, time):
+        """
+        Return (value, commit_time) of the newest version committed at or before
+        the given time, or None if there is no such version.
+        """
+        index = bisect_right(self.commit_times, time)
+        if index == 0:
+            return None
+        return self.values[index - 1], self.commit_times[index - 1]
+
+    def latest(self):
+        """Return (value, commit_time) of the newest version, or None if empty."""
+        if not self.commit_times:
+            return None
+        return self.values[-1], self.commit_times[-1]
+
+    def keep_latest(self):
+        """Drop every version except the newest one."""
+        if len(self.commit_times) > 1:
+            del self.commit_times[:-1]
+            del self.values[:-1]
+
+    def collect(self, horizon):
+        """
+        Drop versions no snapshot at or after the horizon can see.
+        The newest version at or before the horizon is kept, since it is the
+        one a transaction starting at the horizon reads.
+        Returns the number of versions dropped.
+        """
+        index = bisect_right(self.commit_times, horizon) - 1
+        if index <= 0:
+            return 0
+        del self.commit_times[:index]
+        del self.values[:index]
+        return index
@@ -0,0 +1,95 @@
+from collections import deque
+
+
+class WaitingRead:
+    __slots__ = ("transaction_id", "variable", "site_id", "cancelled", "waiter")
+
+    def __init__(self, transaction_id, variable, site_id):
+        self.transaction_id = transaction_id
+        self.variable = variable
+        self.site_id = site_id
+        self.cancelled = False  # Set when the transaction ends while still waiting
+        self.waiter = None  # Optional callback(value) run when the read is served or cancelled
+
+    def notify(self, value):
+        if self.waiter is not None:
+            self.waiter(value)
+
+
+class WaitQueue:
+    def __init__(self):
+        self.by_site = {}  # site_id -> deque of WaitingRead, in arrival order
+        self.by_transaction = {}  # transaction_id -> deque of WaitingRead, in arrival order
+        self.live = 0  # Number of reads still waiting
+        self.cancelled = {}  # site_id -> number of cancelled entries left in its deque
+
+    def __len__(self):
+        return self.live
+
+    def add(self, transaction_id, variable, site_id):
+        """Block a read of a variable by a transaction until the given site recovers."""
+        entry = WaitingRead(transaction_id, variable, site_id)
+        self.by_site.setdefault(site_id, deque()).append(entry)
+        self.by_transaction.setdefault(transaction_id, deque()).append(entry)
+        self.live += 1
+        return entry
+
+    def waiting_on(self, site_id):
+        """Return the number of reads waiting on a site."""
+        return len(self.by_site.get(site_id, ())) - self.cancelled.get(site_id, 0)
+
+    def pending(self, transaction_id):
+        """Return the reads a transaction is waiting on, oldest first."""
+        return self.by_transaction.get(transaction_id, ())
+
+    def take(self, site_id):
+        """
+        Remove and return the reads waiting on a site, in arrival order.
+        Reads that cannot be served yet should be handed back with requeue.
+        """
+        entries = self.by_site.pop(site_id, None)
+        self.cancelled.pop(site_id, None)
+        if not entries:
+            return []
+        ready = []
+        for entry in entries:
+            if entry.cancelled:
+                continue
+            self._forget(entry)
+            ready.append(entry)
+        return ready
+
+    def requeue(self, entry):
+        """Put back a read taken with take that is still blocked."""
+        self.by_site.setdefault(entry.site_id, deque()).append(entry)
+        self.by_transaction.setdefault(entry.transaction_id, deque()).append(entry)
+        self.live += 1
+
+    def cancel(self, transaction_id):
+        """Drop every read the transaction is waiting on, e.g. when it commits or aborts."""
+        entries = self.by_transaction.pop(transaction_id, None)
+        if not entries:
+            return
+        for entry in entries:
+            entry.cancelled = True
+            entry.notify(None)
+            self.live -= 1
+            site_id = entry.site_id
+            dead = self.cancelled.get(site_id, 0) + 1
+            site_entries = self.by_site[site_id]
+            if dead * 2 > len(site_entries):
+                # Mostly cancelled entries: compact the site's deque
+                self.by_site[site_id] = deque(e for e in site_entries if not e.cancelled)
+                dead = 0
+            self.cancelled[site_id] = dead
+
+    def _forget(self, entry):
+        """Remove a taken entry from its transaction's deque."""
+        entries = self.by_transaction[entry.transaction_id]
+        if entries[0] is entry:
+            entries.popleft()
+        else:
+            entries.remove(entry)
+        if not entries:
+            del self.by_transaction[entry.transaction_id]
+        self.live -= 1
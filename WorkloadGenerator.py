@@ -0,0 +1,124 @@
+import argparse
+import random
+import sys
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class WorkloadGenerator:
+    def __init__(self, transactions=1000, operations_per_transaction=8, read_ratio=0.8, zipf_skew=1.0,
+                 replicated_ratio=0.5, concurrency=8, failure_rate=0.0, recovery_delay=20,
+                 num_sites=10, num_variables=20, dump=True, seed=None):
+        """
+        Describe a synthetic workload in the begin/R/W/end/fail/recover/dump language.
+        - transactions: number of transactions to run.
+        - operations_per_transaction: reads and writes issued by each transaction.
+        - read_ratio: fraction of those operations that are reads.
+        - zipf_skew: Zipf exponent of key popularity (0 for uniform access).
+        - replicated_ratio: fraction of accesses to replicated (even-indexed) variables.
+        - concurrency: number of transactions open at the same time.
+        - failure_rate: probability that a site fails after any command.
+        - recovery_delay: number of commands a failed site stays down.
+        """
+        self.transactions = transactions
+        self.operations_per_transaction = operations_per_transaction
+        self.read_ratio = read_ratio
+        self.zipf_skew = zipf_skew
+        self.replicated_ratio = replicated_ratio
+        self.concurrency = max(1, concurrency)
+        self.failure_rate = failure_rate
+        self.recovery_delay = recovery_delay
+        self.num_sites = num_sites
+        self.num_variables = num_variables
+        self.dump = dump
+        self.seed = seed
+
+    def _key_space(self, indices):
+        """Return (variables, cumulative Zipf weights) with the hottest variable first."""
+        variables = [f"x{i}" for i in indices]
+        weights = [1.0 / (rank ** self.zipf_skew) for rank in range(1, len(variables) + 1)]
+        return variables, list(accumulate(weights))
+
+    def lines(self):
+        """Lazily generate the commands of the workload, one line at a time."""
+        rng = random.Random(self.seed)
+        replicated = self._key_space(range(2, self.num_variables + 1, 2))
+        non_replicated = self._key_space(range(1, self.num_variables + 1, 2))
+        if not replicated[0]:
+            replicated = non_replicated
+        if not non_replicated[0]:
+            non_replicated = replicated
+
+        def pick_variable():
+            variables, cumulative = replicated if rng.random() < self.replicated_ratio else non_replicated
+            return variables[bisect_right(cumulative, rng.random() * cumulative[-1])]
+
+        open_transactions = {}  # transaction_id -> operations left before end
+        down_sites = {}  # site_id -> command count at which it recovers
+        next_transaction = 1
+        commands = 0
+
+        while open_transactions or next_transaction <= self.transactions:
+            if len(open_transactions) < self.concurrency and next_transaction <= self.transactions:
+                open_transactions[next_transaction] = self.operations_per_transaction
+                yield f"begin(T{next_transaction})"
+                next_transaction += 1
+            else:
+                transaction_id = rng.choice(list(open_transactions))
+                remaining = open_transactions[transaction_id]
+                if remaining == 0:
+                    del open_transactions[transaction_id]
+                    yield f"end(T{transaction_id})"
+                elif rng.random() < self.read_ratio:
+                    open_transactions[transaction_id] = remaining - 1
+                    yield f"R(T{transaction_id},{pick_variable()})"
+                else:
+                    open_transactions[transaction_id] = remaining - 1
+                    yield f"W(T{transaction_id},{pick_variable()},{rng.randrange(1000)})"
+            commands += 1
+
+            # Recover sites whose downtime is over, then maybe fail another one
+            for site_id in [s for s, due in down_sites.items() if due <= commands]:
+                del down_sites[site_id]
+                yield f"recover({site_id})"
+            if self.failure_rate and rng.random() < self.failure_rate:
+                site_id = rng.randint(1, self.num_sites)
+                if site_id not in down_sites:
+                    down_sites[site_id] = commands + self.recovery_delay
+                    yield f"fail({site_id})"
+
+        for site_id in sorted(down_sites):
+            yield f"recover({site_id})"
+        if self.dump:
+            yield "dump()"
+
+
+def add_workload_arguments(parser):
+    """Add the WorkloadGenerator settings to an argparse parser."""
+    parser.add_argument("--transactions", type=int, default=1000)
+    parser.add_argument("--operations", type=int, default=8, help="reads and writes per transaction")
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    parser.add_argument("--zipf", type=float, default=1.0, help="Zipf skew of key popularity, 0 for uniform")
+    parser.add_argument("--replicated-ratio", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--recovery-delay", type=int, default=20)
+    parser.add_argument("--sites", type=int, default=10)
+    parser.add_argument("--variables", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def generator_from_arguments(args):
+    return WorkloadGenerator(
+        transactions=args.transactions, operations_per_transaction=args.operations, read_ratio=args.read_ratio,
+        zipf_skew=args.zipf, replicated_ratio=args.replicated_ratio, concurrency=args.concurrency,
+        failure_rate=args.failure_rate, recovery_delay=args.recovery_delay, num_sites=args.sites,
+        num_variables=args.variables, seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic transaction trace to stdout.")
+    add_workload_arguments(parser)
+    generator = generator_from_arguments(parser.parse_args())
+    sys.stdout.writelines(line + "\n" for line in generator.lines())
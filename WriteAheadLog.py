@@ -0,0 +1,105 @@
+import mmap
+import os
+import struct
+
+MAGIC = b"RCWAL001"
+
+COMMIT_RECORD = 1
+SITE_RECORD = 2
+
+# Record layouts (little-endian):
+#   commit: type, transaction_id, commit_time, write count, then per write: site_id, variable index, value, version time
+#   site:   type, site_id, timestamp, status (1 = up, 0 = down)
+COMMIT_HEADER = struct.Struct("<BqqI")
+COMMIT_WRITE = struct.Struct("<iiqq")
+SITE_EVENT = struct.Struct("<Biqb")
+
+
+class WriteAheadLog:
+    def __init__(self, path, sync=False):
+        """
+        Open an append-only log of committed writes and site events.
+        Each transaction's write set goes out as one record with one write call
+        (group commit); with sync, the record is also fsync'ed before the
+        commit is reported. A torn record left at the end of an existing log by
+        a crash is cut off, so new records follow the last complete one.
+        """
+        self.path = path
+        self.sync = sync
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new:
+            length = self.valid_length(path)
+            if length < os.path.getsize(path):
+                os.truncate(path, length)
+        self.file = open(path, "ab")
+        if new:
+            self.file.write(MAGIC)
+            self.file.flush()
+
+    def tell(self):
+        """Return the offset just past the last record written."""
+        return self.file.tell()
+
+    def _append(self, record):
+        self.file.write(record)
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+
+    def log_commit(self, transaction_id, commit_time, writes):
+        """Log a committed transaction's writes: a list of (site_id, variable index, value, version time)."""
+        pack = COMMIT_WRITE.pack
+        record = COMMIT_HEADER.pack(COMMIT_RECORD, transaction_id, commit_time, len(writes))
+        self._append(record + b"".join(pack(*write) for write in writes))
+
+    def log_site(self, site_id, timestamp, status):
+        """Log a site failure ("down") or recovery ("up")."""
+        self._append(SITE_EVENT.pack(SITE_RECORD, site_id, timestamp, 1 if status == "up" else 0))
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def valid_length(path):
+        """Return the offset just past the last complete record of a log."""
+        length = len(MAGIC)
+        for record in WriteAheadLog.records(path):
+            length = record[-1]
+        return length
+
+    @staticmethod
+    def records(path, offset=0):
+        """
+        Yield the records of a log starting at a byte offset (0 for the first record):
+        ("commit", transaction_id, commit_time, writes, end_offset) or
+        ("site", site_id, timestamp, status, end_offset).
+        A torn record at the end of the log is ignored.
+        """
+        if not os.path.exists(path) or os.path.getsize(path) <= len(MAGIC):
+            return
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise Exception(f"{path} is not a write-ahead log.")
+            position = max(offset, len(MAGIC))
+            size = len(data)
+            while position < size:
+                record_type = data[position]
+                if record_type == COMMIT_RECORD:
+                    if position + COMMIT_HEADER.size > size:
+                        return
+                    _, transaction_id, commit_time, count = COMMIT_HEADER.unpack_from(data, position)
+                    end = position + COMMIT_HEADER.size + count * COMMIT_WRITE.size
+                    if end > size:
+                        return
+                    writes = [COMMIT_WRITE.unpack_from(data, position + COMMIT_HEADER.size + i * COMMIT_WRITE.size)
+                              for i in range(count)]
+                    yield "commit", transaction_id, commit_time, writes, end
+                elif record_type == SITE_RECORD:
+                    end = position + SITE_EVENT.size
+                    if end > size:
+                        return
+                    _, site_id, timestamp, status = SITE_EVENT.unpack_from(data, position)
+                    yield "site", site_id, timestamp, "up" if status else "down", end
+                else:
+                    raise Exception(f"Corrupt write-ahead log record at offset {position} in {path}.")
+                position = end